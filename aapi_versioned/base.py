@@ -1,68 +1,174 @@
 import logging
+from itertools import count
+from os import getenv
+from time import perf_counter
 from typing import Any, Iterable, Iterator, Optional
 
 import psycopg
 from psycopg import Connection
 
+from aapi_versioned import metrics
+
 logger = logging.getLogger(__name__)
 
+# Namen voor server-side cursors (zie `SimpleDatabase.fetchmany`).
+_cursor_ids = count()
+
 
 def connect_db(db_config: dict[str, str]) -> Connection:
     return psycopg.connect(**db_config)
 
 
+def env_db_config() -> dict[str, str]:
+    """Leest de verbindingsgegevens uit de environment variabelen
+    `AAPI_HOST`, `AAPI_NAME`, `AAPI_USER` en `AAPI_PASS`.
+    """
+    return {
+        'host': getenv('AAPI_HOST'),
+        'dbname': getenv('AAPI_NAME'),
+        'user': getenv('AAPI_USER'),
+        'password': getenv('AAPI_PASS'),
+        'port': 5432,
+        'sslmode': 'require',
+    }
+
+
 class SimpleDatabase:
     def __init__(self, connection: Connection) -> None:
         self.connection = connection
 
+    def columns(self, table_name: str) -> dict[str, str]:
+        """Geeft de kolommen van de tabel met hun (Postgres) datatype.
+        """
+        query = Query('SELECT column_name, data_type'
+                      ' FROM information_schema.columns'
+                      ' WHERE table_schema = current_schema()'
+                      ' AND table_name = %s', [table_name])
+        return dict(self.fetchmany(query))
+
     def copy(self, query: 'Query', rows: Iterable[tuple]) -> None:
         logger.debug(query)
         try:
-            with self.connection.cursor() as cur:
+            with self.timer('db_copy', query) as n, \
+                    self.connection.cursor() as cur:
                 with cur.copy(query.query) as copy:
                     for row in rows:
                         copy.write_row(row)
+                        n[0] += 1
             self.connection.commit()
         except psycopg.Error as err:
             self.connection.rollback()
             raise err
 
-    def execute(self, query: 'Query') -> None:
+    def ensure_columns(self, table_name: str, fields_def: dict[str, str]
+                       ) -> dict[str, str]:
+        """Voegt ontbrekende kolommen toe aan een bestaande tabel.
+
+        De kolommen worden toegevoegd zonder default en zonder NOT NULL,
+        zodat Postgres de tabel niet hoeft te herschrijven.
+
+        :return: De kolommen in de tabel die niet in `fields_def` staan.
+        """
+        columns = self.columns(table_name)
+
+        for field, field_type in fields_def.items():
+            if field not in columns:
+                logger.info(f'Adding column {field!r} to {table_name!r}.')
+                self.execute(Query.add_column(table_name, field, field_type))
+
+        return {k: v for k, v in columns.items() if k not in fields_def}
+
+    def execute(self, query: 'Query') -> int:
+        """Voert de query uit en geeft het aantal geraakte rijen.
+        """
         logger.debug(query)
         try:
-            with self.connection.cursor() as cur:
+            with self.timer('db_execute', query) as n, \
+                    self.connection.cursor() as cur:
                 cur.execute(query.query, query.params)
+                n[0] = max(cur.rowcount, 0)
             self.connection.commit()
         except psycopg.Error as err:
             self.connection.rollback()
             raise err
+        return n[0]
+
+    def fetchmany(self, query: 'Query', batch_size: int = 5000,
+                  server_side: bool = False) -> Iterator[tuple]:
+        """Geeft de rijen van de query, per `batch_size` opgehaald.
 
-    def fetchmany(self, query: 'Query', batch_size: int = 5000
-                   ) -> Iterator[tuple]:
+        :param server_side: Gebruik een server-side cursor, zodat niet het
+            hele resultaat in het geheugen komt maar steeds een batch. De
+            cursor leeft in de transactie: commit niet tijdens het lezen.
+        """
         logger.debug(query)
+        name = f'aapi_fetch_{next(_cursor_ids)}' if server_side else ''
+        # Alleen de tijd in de database telt, niet die van de aanroeper
+        # tussen de batches.
+        seconds = 0.0
+        rows = 0
         try:
-            with self.connection.cursor() as cur:
+            with self.connection.cursor(name=name) as cur:
+                start = perf_counter()
                 cur.execute(query.query, query.params)
-
-                while batch := cur.fetchmany(size=batch_size):
+                seconds += perf_counter() - start
+
+                while True:
+                    start = perf_counter()
+                    batch = cur.fetchmany(size=batch_size)
+                    seconds += perf_counter() - start
+                    if not batch:
+                        break
+                    rows += len(batch)
                     for row in batch:
                         yield row
         except psycopg.Error as err:
             self.connection.rollback()
             raise err
+        finally:
+            metrics.current().observe('db_fetchmany', seconds, rows,
+                                      **self._labels(query))
 
     def fetchone(self, query: 'Query') -> tuple:
         logger.debug(query)
         try:
-            with self.connection.cursor() as cur:
+            with self.timer('db_fetchone', query) as n, \
+                    self.connection.cursor() as cur:
                 cur.execute(query.query, query.params)
                 row = cur.fetchone()
+                n[0] = row is not None
             self.connection.commit()
         except psycopg.Error as err:
             self.connection.rollback()
             raise err
         return row
 
+    def vacuum(self, table_name: str) -> None:
+        """Ruimt de tabel op en werkt de statistieken bij (VACUUM ANALYZE).
+
+        VACUUM kan niet binnen een transactie draaien, dus de verbinding
+        staat er tijdelijk voor op autocommit.
+        """
+        query = Query(f'VACUUM (ANALYZE) {table_name}')
+        logger.debug(query)
+        autocommit = self.connection.autocommit
+        self.connection.commit()
+        self.connection.autocommit = True
+        try:
+            with self.timer('db_vacuum', query):
+                self.connection.execute(query.query)
+        finally:
+            self.connection.autocommit = autocommit
+
+    def timer(self, name: str, query: 'Query'):
+        """Meet een query, met de tabel en het soort statement als labels.
+        """
+        return metrics.timer(name, **self._labels(query))
+
+    def _labels(self, query: 'Query') -> dict[str, str]:
+        return {'table': getattr(self, 'table_name', ''),
+                'statement': query.base_query.split(' ', 1)[0]}
+
 
 class Query:
     """Een klasse om op leesbare manier SQL te schrijven.
@@ -127,6 +233,12 @@ class Query:
     def query(self) -> str:
         return str(self)
 
+    @classmethod
+    def add_column(cls, table_name: str, field: str, field_type: str
+                   ) -> 'Query':
+        return cls(f'ALTER TABLE {table_name}'
+                   f' ADD COLUMN IF NOT EXISTS "{field}" {field_type}')
+
     @classmethod
     def copy(cls, table_name: str, fields) -> 'Query':
         fields = ', '.join(quote_fields(fields))
@@ -143,6 +255,13 @@ class Query:
         fields = ', '.join(f'"{f}" {t}' for f, t in fields_def.items())
         return cls(f'CREATE TABLE IF NOT EXISTS {table_name} ({fields})')
 
+    @classmethod
+    def create_index(cls, index_name: str, table_name: str,
+                     fields: Iterable[str]) -> 'Query':
+        fields = ', '.join(quote_fields(fields))
+        return cls(f'CREATE INDEX IF NOT EXISTS {index_name}'
+                   f' ON {table_name} ({fields})')
+
     @classmethod
     def insert(cls, table_name: str) -> 'Query':
         return cls(f'INSERT INTO {table_name}', [],
@@ -0,0 +1,139 @@
+"""
+Compactie van vervangen versies volgens de bewaartermijn per endpoint.
+
+Zie `Retention`. Elke compactie wordt als job gelogd in de sync log, met
+als target de tabel plus ".compact" en als `deleted` het aantal verwijderde
+versies.
+
+Gebruik:
+    python -m aapi_versioned.compact [--archive]
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from aapi_versioned.base import Query, connect_db, env_db_config
+from aapi_versioned.db import DB, Endpoint
+from aapi_versioned.registry import Retention
+from aapi_versioned.sync_log import SyncLog
+
+logger = logging.getLogger(__name__)
+
+
+def compact(endpoint: Endpoint, log: SyncLog,
+            now: Optional[datetime] = None, batch_size: int = 10000,
+            archive: bool = False) -> int:
+    """Verwijdert de vervangen versies die buiten de bewaartermijn van het
+    endpoint vallen.
+
+    Er wordt in batches van `batch_size` versies verwijderd, elk in een
+    eigen transactie. Daarna volgt een VACUUM ANALYZE van de tabel.
+
+    :param endpoint: Het endpoint, met een `retention`.
+    :param log: De sync log.
+    :param now: Het tijdstip vanaf waar de termijnen gelden.
+    :param batch_size: Het aantal versies per batch.
+    :param archive: Verplaats de versies naar `{tabel}_archive` in plaats
+        van ze te verwijderen.
+    :return: Het aantal verwijderde versies.
+    """
+    if endpoint.retention is None:
+        return 0
+
+    started = datetime.now()
+    now = now or started
+    target = f'{endpoint.table_name}.compact'
+    job_id = log.start(target, started)
+    total = 0
+
+    try:
+        log.status(job_id, 'compact')
+        query = query_compact(endpoint, endpoint.retention, now, batch_size,
+                              archive)
+        if archive:
+            endpoint.execute(Query(
+                f'CREATE TABLE IF NOT EXISTS {endpoint.table_name}_archive'
+                f' (LIKE {endpoint.table_name})'))
+            endpoint.ensure_columns(f'{endpoint.table_name}_archive',
+                                    endpoint.columns(endpoint.table_name))
+
+        while n := endpoint.execute(query):
+            total += n
+            log.status(job_id, 'compact', deleted=total)
+
+        log.status(job_id, 'vacuum', deleted=total)
+        endpoint.vacuum(endpoint.table_name)
+
+    except Exception as err:
+        error = f'Compaction failed: {err}'
+        logger.error(f'Job {job_id}: {error}')
+        log.status(job_id, 'failed', finished=datetime.now(), error=error,
+                   deleted=total)
+        return total
+
+    log.status(job_id, 'done', finished=datetime.now(), deleted=total)
+    return total
+
+
+def compact_all(db: DB, log: SyncLog, archive: bool = False) -> None:
+    """Compacteert alle endpoints met een bewaartermijn.
+    """
+    for name, spec in db.specs.items():
+        if spec.retention is not None:
+            compact(getattr(db, name), log, archive=archive)
+
+
+def query_compact(endpoint: Endpoint, retention: Retention, now: datetime,
+                  batch_size: int, archive: bool = False) -> Query:
+    """De query die een batch versies buiten de bewaartermijn verwijdert.
+
+    Een versie blijft bewaard als er een dag- (of maand)grens ligt in
+    [_created, _deleted), oftewel als die versie op dat moment actief was.
+    """
+    def outside(unit: str) -> str:
+        # De eerste grens op of na _created ligt op of na _deleted.
+        return (f"date_trunc('{unit}', \"_created\""
+                f" - interval '1 microsecond')"
+                f" + interval '1 {unit}' >= \"_deleted\"")
+
+    daily_before = now - timedelta(days=retention.keep_days)
+    terms = [f'("_deleted" < %s AND {outside("day")})']
+    params = [daily_before]
+
+    if retention.daily_days is not None:
+        monthly_before = now - timedelta(days=retention.daily_days)
+        terms.append(f'("_deleted" < %s AND {outside("month")})')
+        params.append(monthly_before)
+
+    table = endpoint.table_name
+    batch = (f'SELECT "_id" FROM {table}'
+             f' WHERE "_deleted" IS NOT NULL AND ({" OR ".join(terms)})'
+             f' LIMIT {batch_size:d}')
+    delete = f'DELETE FROM {table} WHERE "_id" IN ({batch})'
+
+    if not archive:
+        return Query(delete, params)
+
+    fields = ', '.join(f'"{f}"' for f in endpoint.fields)
+    return Query(f'WITH moved AS ({delete} RETURNING {fields})'
+                 f' INSERT INTO {table}_archive ({fields})'
+                 f' SELECT {fields} FROM moved', params)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Compacteer vervangen versies volgens de bewaartermijn.')
+    parser.add_argument('--archive', action='store_true',
+                        help='Verplaats de versies naar een archieftabel.')
+    args = parser.parse_args()
+
+    with connect_db(env_db_config()) as conn:
+        log = SyncLog(conn)
+        log.create_table()
+        compact_all(DB(conn), log, args.archive)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
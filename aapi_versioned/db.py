@@ -2,20 +2,17 @@ import logging
 from collections.abc import Iterator, Iterable
 from dataclasses import dataclass
 from datetime import datetime, date, time
-from typing import Generic, Type, Union
+from typing import Any, Generic, Optional, Type, Union
 
 from psycopg import Connection
 
 from aapi.models import Multipolygon, Point, Polygon
 
+from aapi_versioned import registry
 from aapi_versioned.base import SimpleDatabase, Query
-from aapi_versioned.models import (
-    Model, datetimetz,
-    Afvalbijplaatsing, Afvalcluster, Afvalclusterfractie,
-    Afvalcontainerlocatie, Afvalcontainer, Afvalcontainertype, Afvalweging,
-    AfvalvulgraadSidcon, MeldingMijnAmsterdam, MeldingOpenbareRuimte,
-    Buurt, Stadsdeel, Wijk, Winkelgebied,
-)
+from aapi_versioned.rollup import DailyAggregate, Rollup
+from aapi_versioned.models import Model, datetimetz
+from aapi_versioned.registry import EndpointSpec, Retention
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -31,80 +28,72 @@ class Versioned(Generic[Model]):
 
 
 class DB:
-    def __init__(self, connection: Connection) -> None:
-        def endpoint(path: str, model: Type[Model]) -> Endpoint[Model]:
-            return Endpoint(path, model, connection)
+    """Interface voor alle endpoints in de database.
 
+    De endpoints worden beschreven in het register (zie `registry`) en pas
+    aangemaakt als ze worden gebruikt, bijv. `db.meldingen`.
+    """
+    def __init__(self, connection: Connection,
+                 specs: Optional[list[EndpointSpec]] = None) -> None:
+        """Maakt een database interface.
+
+        :param connection: Verbinding met de database.
+        :param specs: Het register. Standaard `registry.endpoints`.
+        """
         # Like API session.
         self.connection = connection
+        self.specs = {spec.name: spec
+                      for spec in (registry.endpoints if specs is None
+                                   else specs)}
 
-        # Huishoudelijk afval
-        # -------------------
-        self.afval_bijplaatsingen = endpoint(
-            'v1_huishoudelijkafval_bijplaatsingen',
-            Afvalbijplaatsing
-        )
-        self.afval_clusters = endpoint(
-            'v1_huishoudelijkafval_cluster',
-            Afvalcluster
-        )
-        self.afval_clusterfracties = endpoint(
-            'v1_huishoudelijkafval_clusterfractie',
-            Afvalclusterfractie
-        )
-        self.afval_containerlocaties = endpoint(
-            'v1_huishoudelijkafval_containerlocatie',
-            Afvalcontainerlocatie
-        )
-        self.afval_containers = endpoint(
-            'v1_huishoudelijkafval_container',
-            Afvalcontainer
-        )
-        self.afval_containertypes = endpoint(
-            'v1_huishoudelijkafval_containertype',
-            Afvalcontainertype
-        )
-        self.afval_vulgraad_sidcon = endpoint(
-            'afval_suppliers_sidcon_filllevels',
-            AfvalvulgraadSidcon
-        )
-        self.afval_wegingen = endpoint(
-            'v1_huishoudelijkafval_weging',
-            Afvalweging
-        )
+    def __getattr__(self, name: str) -> 'Endpoint':
+        # Alleen aangeroepen als het endpoint nog niet bestaat.
+        if name.startswith('_') or name not in self.__dict__.get('specs', {}):
+            raise AttributeError(name)
+        endpoint = self.endpoint(self.specs[name])
+        setattr(self, name, endpoint)
+        return endpoint
 
-        # Meldingen
-        # ---------
-        self.meldingen = endpoint(
-            'v1_meldingen_meldingen',
-            MeldingOpenbareRuimte
-        )
-        self.meldingen_buurt = endpoint(
-            'v1_meldingen_meldingen_buurt',
-            MeldingMijnAmsterdam
-        )
+    def endpoint(self, spec: EndpointSpec) -> 'Endpoint':
+        """Maakt het endpoint van de beschrijving.
+        """
+        endpoint = Endpoint(spec.table_name, spec.model, self.connection,
+                            spec.key)
+        endpoint.retention = spec.retention
+        if spec.rollup is not None:
+            endpoint.rollup = Rollup(spec.rollup.table_name,
+                                     spec.table_name,
+                                     spec.rollup.key_field,
+                                     spec.rollup.day_field,
+                                     spec.rollup.value_field,
+                                     self.connection)
+        return endpoint
 
-        # Gebieden
-        # --------
-        self.buurten = endpoint(
-            'v1_gebieden_buurten',
-            Buurt
-        )
-        self.stadsdelen = endpoint(
-            'v1_gebieden_stadsdelen',
-            Stadsdeel
-        )
-        self.wijken = endpoint(
-            'v1_gebieden_wijken',
-            Wijk
-        )
+    def by_table(self, table_name: str) -> Optional['Endpoint']:
+        """Geeft het endpoint van de tabel, of None als dat niet bestaat.
+        """
+        for name, spec in self.specs.items():
+            if spec.table_name == table_name:
+                return getattr(self, name)
+        return None
 
-        # Winkelgebieden
-        # --------------
-        self.winkelgebieden = endpoint(
-            'v1_winkelgebieden_winkelgebieden',
-            Winkelgebied
-        )
+    def daily(self, name: str, **params) -> Iterator[DailyAggregate]:
+        """Geeft de dagtotalen van het endpoint (zie `Rollup`).
+
+        :param name: De naam van het endpoint, bijv. 'afval_wegingen'.
+        :param params: Condities op de dagtotalen, bijv.
+            `key='REA00252', day__gte=date(2022, 3, 1)`.
+        """
+        rollup = getattr(self, name).rollup
+        if rollup is None:
+            raise TypeError(f'{name!r} has no daily aggregates.')
+        return rollup.all(**params)
+
+    @property
+    def endpoints(self) -> list['Endpoint']:
+        """Geeft de lijst van alle endpoints.
+        """
+        return [getattr(self, name) for name in self.specs]
 
 
 class Endpoint(SimpleDatabase, Generic[Model]):
@@ -119,20 +108,32 @@ class Endpoint(SimpleDatabase, Generic[Model]):
         Point: 'POINT',
         Polygon: 'TEXT',
         str: 'TEXT',
-        time: 'TIME',
+        time: 'TIME WITHOUT TIME ZONE',
     }
 
     def __init__(self, table_name: str, model: Type[Model],
-                 connection: Connection) -> None:
+                 connection: Connection,
+                 key: Optional[tuple[str, ...]] = None) -> None:
         """Creates the endpoint interface fetching item_types from url.
 
         :param table_name: The database table holding all endpoint records.
         :param model: The type of items this endpoint returns.
         :param connection: Connection to the database.
+        :param key: The business key fields identifying a record across
+            versions. Defaults to `('id',)` if the model has an id field.
         """
         super().__init__(connection)
         self.table_name = table_name
         self.model = model
+        if key is None and 'id' in self.model_fields:
+            key = ('id',)
+        self.key = key or ()
+        self.rollup: Optional[Rollup] = None
+        self.retention: Optional[Retention] = None
+        # Velden waarvoor `migrate` net een kolom heeft toegevoegd. De sync
+        # legt ze vast in de sync log tot ze zijn ingevuld (zie
+        # `Task.diff_backfill`).
+        self.new_fields: tuple[str, ...] = ()
         # self.connection = connection
 
     @property
@@ -143,6 +144,12 @@ class Endpoint(SimpleDatabase, Generic[Model]):
     def model_fields(self) -> tuple[str, ...]:
         return tuple(self.model.__annotations__)
 
+    @property
+    def sort_fields(self) -> tuple[str, ...]:
+        """De velden waarop records van een job uniek gesorteerd worden.
+        """
+        return self.key + ('_id',)
+
     @property
     def version_fields(self) -> tuple[str, str, str]:
         return '_id', '_created', '_deleted'
@@ -156,18 +163,70 @@ class Endpoint(SimpleDatabase, Generic[Model]):
         self.copy(query, data)
 
     def all(self, **params) -> Iterator[Versioned[Model]]:
-        batch_size = 5000
-        query = Query.select(self.table_name, self.fields).where(**params)
         return (Versioned(row[0], row[1], row[2], self.model(*row[3:]))
-                for row in self.fetchmany(query, batch_size))
+                for row in self.rows(**params))
+
+    def backfill(self, fields: tuple[str, ...], rows: Iterable[tuple]
+                 ) -> None:
+        """Vult kolommen van bestaande versies in, zonder nieuwe versie.
+
+        :param fields: De kolommen.
+        :param rows: Per versie het `_id` en de waardes van `fields`.
+        """
+        temp = f'{self.table_name}_backfill'
+        fields = ('_id',) + tuple(fields)
+        columns = ', '.join(f'"{f}"' for f in fields)
+        updates = ', '.join(f'"{f}" = b."{f}"' for f in fields[1:])
+
+        self.execute(Query(f'DROP TABLE IF EXISTS pg_temp.{temp}'))
+        self.execute(Query(f'CREATE TEMPORARY TABLE {temp} AS'
+                           f' SELECT {columns} FROM {self.table_name}'
+                           f' WITH NO DATA'))
+        self.copy(Query.copy(f'pg_temp.{temp}', fields), rows)
+        self.execute(Query(f'UPDATE {self.table_name} t SET {updates}'
+                           f' FROM pg_temp.{temp} b'
+                           f' WHERE t."_id" = b."_id"'))
+        self.execute(Query(f'DROP TABLE pg_temp.{temp}'))
+
+    def changes(self, job_id: datetime, batch_size: int = 5000
+                ) -> Iterator[tuple]:
+        """Geeft alle records die door de job zijn toegevoegd of
+        verwijderd, in volgorde van `_id`. De records worden per
+        `batch_size` van de server gelezen.
+        """
+        query = (Query.select(self.table_name, self.fields)
+                 .where(_created=job_id)
+                 .or_(_deleted=job_id)
+                 .order_by('_id'))
+        return self.fetchmany(query, batch_size, server_side=True)
 
     def count(self, **params) -> int:
-        query, params = Query.count(self.table_name).where(**params)
+        query = Query.count(self.table_name).where(**params)
         return self.fetchone(query)[0]
 
     def create_table(self) -> None:
+        """Maakt de tabel, of werkt deze bij als het model is veranderd.
+
+        Nieuwe velden worden als lege kolommen toegevoegd. Kolommen van
+        vervallen velden blijven staan maar worden niet meer gebruikt:
+        alle queries noemen expliciet de velden van het huidige model.
+        """
         query = self.query_create_table()
         self.execute(query)
+        self.migrate()
+        if self.key:
+            query = Query.create_index(f'{self.table_name}_key_idx',
+                                       self.table_name,
+                                       self.key + ('_created',))
+            self.execute(query)
+        # De mutaties van een job (`changes`, `page`, `Rollup.update`)
+        # zoeken op `_created = job OR _deleted = job`.
+        for field in ('_created', '_deleted'):
+            query = Query.create_index(f'{self.table_name}{field}_idx',
+                                       self.table_name, (field,))
+            self.execute(query)
+        if self.rollup:
+            self.rollup.create_table()
 
     def delete(self, deleted: datetime, record_ids: Iterable[int]) -> None:
         query = (Query.update(self.table_name)
@@ -175,14 +234,110 @@ class Endpoint(SimpleDatabase, Generic[Model]):
                  .where(_deleted=None, _id__in=record_ids))
         self.execute(query)
 
+    def history(self, key: Any) -> list[Versioned[Model]]:
+        """Geeft alle versies van het record met de gegeven sleutel, van
+        oud naar nieuw.
+
+        :param key: De waarde van `Endpoint.key`, of een tuple met de
+            waardes als de sleutel uit meerdere velden bestaat.
+        """
+        if not self.key:
+            raise TypeError(f'{self.table_name!r} has no key.')
+        if len(self.key) == 1:
+            key = (key,)
+        query = (Query.select(self.table_name, self.fields)
+                 .where(**dict(zip(self.key, key)))
+                 .order_by('_created', '_id'))
+        return [Versioned(row[0], row[1], row[2], self.model(*row[3:]))
+                for row in self.fetchmany(query)]
+
+    def ids(self, **params) -> Iterator[int]:
+        """Geeft alleen de `_id` van alle records die voldoen aan `params`.
+        """
+        return (row[0] for row in self.rows(('_id',), **params))
+
+    def last_modified(self) -> Union[datetime, None]:
+        """Geeft het tijdstip van de laatste mutatie in de tabel.
+        """
+        query = Query(f'SELECT GREATEST(MAX("_created"), MAX("_deleted"))'
+                      f' FROM {self.table_name}')
+        return self.fetchone(query)[0]
+
+    def migrate(self) -> None:
+        """Brengt de kolommen van de tabel in lijn met het model.
+
+        Nieuwe kolommen zijn leeg in alle bestaande versies. Ze komen in
+        `new_fields`, zodat de sync ze invult in plaats van elk actief
+        record als gewijzigd te zien.
+        """
+        type_map = self.__class__.type_map
+        fields_def = {k: type_map[v]
+                      for k, v in self.model.__annotations__.items()}
+        before = self.columns(self.table_name)
+        ignored = self.ensure_columns(self.table_name, fields_def)
+        added = tuple(k for k in fields_def if k not in before)
+        if added and before:
+            self.new_fields = added
+        ignored = [k for k in ignored if k not in self.version_fields]
+        if ignored:
+            logger.info(f'Ignoring columns {ignored} of {self.table_name!r}'
+                        f' that are no longer in the model.')
+
+        columns = self.columns(self.table_name)
+        for field, field_type in fields_def.items():
+            if columns.get(field, field_type.lower()) != field_type.lower():
+                logger.warning(f'Column {field!r} of {self.table_name!r}'
+                               f' has type {columns[field]!r} instead of'
+                               f' {field_type!r}.')
+
     def one(self, **params) -> Versioned[Model]:
         query = Query.select(self.table_name, self.fields).where(**params)
         row = self.fetchone(query)
         return Versioned(row[0], row[1], row[2], self.model(*row[3:]))
 
+    def page(self, job_id: datetime, after: Optional[tuple] = None,
+             limit: int = 100) -> list[tuple]:
+        """Geeft een pagina van de records die door de job zijn toegevoegd
+        of verwijderd, gesorteerd op `sort_fields`.
+
+        :param job_id: Het tijdstip van de job.
+        :param after: De waardes van `sort_fields` van het laatste record
+            van de vorige pagina. Standaard de eerste pagina.
+        :param limit: Het maximale aantal records.
+        """
+        sort_fields = self.sort_fields
+        query = Query.select(self.table_name, self.fields)
+
+        if after is None:
+            query = query.where(_created=job_id).or_(_deleted=job_id)
+        else:
+            # (a, b) > (x, y) als a > x, of a = x en b > y.
+            for i, field in enumerate(sort_fields):
+                terms = dict(zip(sort_fields[:i], after[:i]))
+                terms[f'{field}__gt'] = after[i]
+                query = (query.where(_created=job_id, **terms)
+                         .or_(_deleted=job_id, **terms))
+
+        query = query.order_by(*sort_fields).limit(limit)
+        return list(self.fetchmany(query, limit))
+
+    def rows(self, fields: Optional[Iterable[str]] = None, **params
+             ) -> Iterator[tuple]:
+        """Geeft de records als kale tuples, zonder `Versioned` of model.
+
+        :param fields: De kolommen die worden opgehaald, in deze volgorde.
+            Standaard alle `fields`. Laat brede kolommen (zoals geometrie)
+            weg als ze niet nodig zijn.
+        :param params: Condities op de records (zie `Query.where`).
+        """
+        batch_size = 5000
+        fields = self.fields if fields is None else tuple(fields)
+        query = Query.select(self.table_name, fields).where(**params)
+        return self.fetchmany(query, batch_size)
+
     def twenty(self, job_id: datetime) -> Iterator[tuple]:
         fields = self.fields    # Includes model and versioning.
-        order_by = ('id', '_created') if 'id' in fields else ('_id',)
+        order_by = self.key + ('_created',) if self.key else ('_id',)
         query = (Query.select(self.table_name, fields)
                  .where(_created=job_id)
                  .or_(_deleted=job_id)
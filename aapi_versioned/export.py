@@ -0,0 +1,88 @@
+from datetime import date, datetime, time
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from aapi.models import Multipolygon, Point, Polygon
+
+from aapi_versioned.db import Endpoint
+from aapi_versioned.models import datetimetz
+from aapi_versioned.sync import Sync
+from aapi_versioned.sync_log import SyncLog
+
+arrow_type_map = {
+    bool: pa.bool_(),
+    date: pa.date32(),
+    datetime: pa.timestamp('us'),
+    datetimetz: pa.timestamp('us', tz='UTC'),
+    float: pa.float64(),
+    int: pa.int64(),
+    Multipolygon: pa.string(),
+    Point: pa.string(),
+    Polygon: pa.string(),
+    str: pa.string(),
+    time: pa.time64('us'),
+}
+
+
+def arrow_schema(endpoint: Endpoint) -> pa.Schema:
+    """Geeft het Arrow schema van alle velden (incl. versie) van het
+    endpoint.
+    """
+    return pa.schema(
+        [('_id', pa.int64()),
+         ('_created', pa.timestamp('us')),
+         ('_deleted', pa.timestamp('us'))]
+        + [(k, arrow_type_map[v])
+           for k, v in endpoint.model.__annotations__.items()]
+    )
+
+
+def write_changes(path: Union[str, Path], sync: Sync, log: SyncLog,
+                  batch_size: int = 5000) -> None:
+    """Schrijft de mutaties van elke afgeronde job naar een Parquet-bestand.
+
+    Per target komt er een map met daarin `{job_id}.parquet`. Jobs waarvan
+    het bestand al bestaat worden overgeslagen. De records worden per
+    `batch_size` uit de database gelezen en weggeschreven zodat het
+    geheugengebruik begrensd blijft.
+
+    Ook mislukte jobs worden geëxporteerd: een job kan mislukken nadat de
+    toevoegingen al zijn vastgelegd. Alleen lopende jobs worden
+    overgeslagen.
+    """
+    path = Path(path)
+
+    for item in log.all(status__in=('done', 'failed')):
+        endpoint = sync.db.by_table(item.target)
+        if endpoint is None:
+            continue
+
+        file = path / item.target / f'{item.id}.parquet'
+        if file.exists():
+            continue
+
+        file.parent.mkdir(parents=True, exist_ok=True)
+        rows = endpoint.changes(item.started, batch_size)
+        write_parquet(file, arrow_schema(endpoint), rows, batch_size)
+
+
+def write_parquet(file: Path, schema: pa.Schema, rows: Iterable[tuple],
+                  batch_size: int = 5000) -> None:
+    """Schrijft rijen in batches naar een Parquet-bestand.
+
+    Er wordt eerst naar een tijdelijk bestand geschreven zodat een
+    afgebroken export bij een volgende run opnieuw wordt gedaan.
+    """
+    tmp_file = file.with_suffix('.tmp')
+    rows = iter(rows)
+
+    with pq.ParquetWriter(tmp_file, schema) as writer:
+        while batch := list(islice(rows, batch_size)):
+            columns = [pa.array(col, type=field.type)
+                       for col, field in zip(zip(*batch), schema)]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+
+    tmp_file.replace(file)
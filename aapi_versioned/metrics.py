@@ -0,0 +1,146 @@
+"""
+Instrumentatie van de synchronisatie.
+
+Alle metingen lopen via de actieve `Metrics`. Standaard worden ze alleen in
+het geheugen opgeteld. Vervang de instrumentatie met `instrument()`, door
+bijvoorbeeld een subclass die `observe` doorstuurt naar een eigen systeem.
+
+    metrics.instrument(Metrics(profile_dir='profiles'))
+    sync.sync_all()
+    metrics.current().write('web/data/metrics.txt')
+"""
+import cProfile
+import logging
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Sample:
+    calls: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+
+
+class Metrics:
+    def __init__(self, profile_dir: Optional[Union[str, Path]] = None
+                 ) -> None:
+        """Maakt een verzameling metingen.
+
+        :param profile_dir: Map waarin per taak een cProfile en een
+            tracemalloc rapport worden geschreven. Standaard uit.
+        """
+        self.profile_dir = None if profile_dir is None else Path(profile_dir)
+        self.samples: dict[tuple[str, tuple[tuple[str, str], ...]],
+                           Sample] = {}
+
+    def observe(self, name: str, seconds: float, rows: int = 0,
+                **labels: str) -> None:
+        """Telt een meting op bij de metingen met dezelfde naam en labels.
+        """
+        key = name, tuple(sorted(labels.items()))
+        sample = self.samples.get(key)
+        if sample is None:
+            sample = self.samples[key] = Sample()
+        sample.calls += 1
+        sample.seconds += seconds
+        sample.rows += rows
+
+    def openmetrics(self) -> str:
+        """Geeft alle metingen in het OpenMetrics tekstformaat.
+        """
+        lines = []
+        names = sorted({name for name, _ in self.samples})
+
+        for name in names:
+            samples = [(labels, sample)
+                       for (n, labels), sample in self.samples.items()
+                       if n == name]
+            for unit in ('calls', 'seconds', 'rows'):
+                lines.append(f'# TYPE aapi_{name}_{unit} counter')
+                for labels, sample in samples:
+                    lbl = ','.join(f'{k}="{v}"' for k, v in labels)
+                    value = getattr(sample, unit)
+                    lines.append(f'aapi_{name}_{unit}_total{{{lbl}}} {value}')
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profileert het blok met cProfile en tracemalloc als er een
+        `profile_dir` is ingesteld.
+        """
+        if self.profile_dir is None:
+            yield
+            return
+
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        profiler = cProfile.Profile()
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            if not tracing:
+                tracemalloc.stop()
+
+            profiler.dump_stats(self.profile_dir / f'{name}.prof')
+            with open(self.profile_dir / f'{name}.mem.txt', 'w') as f:
+                for stat in snapshot.statistics('lineno')[:25]:
+                    f.write(f'{stat}\n')
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[list[int]]:
+        """Meet de duur van het blok.
+
+        Het blok krijgt een lijst `[rows]` waarin het het aantal verwerkte
+        rijen kan bijhouden.
+        """
+        rows = [0]
+        start = perf_counter()
+        try:
+            yield rows
+        finally:
+            self.observe(name, perf_counter() - start, rows[0], **labels)
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Schrijft alle metingen in het OpenMetrics formaat naar `path`.
+        """
+        with open(path, 'w') as f:
+            f.write(self.openmetrics())
+
+
+_metrics = Metrics()
+
+
+def current() -> Metrics:
+    """Geeft de actieve instrumentatie.
+    """
+    return _metrics
+
+
+def instrument(metrics: Metrics) -> None:
+    """Vervangt de actieve instrumentatie.
+    """
+    global _metrics
+    _metrics = metrics
+
+
+def profile(name: str):
+    return _metrics.profile(name)
+
+
+def timer(name: str, **labels: str):
+    return _metrics.timer(name, **labels)
@@ -0,0 +1,226 @@
+"""
+Register van alle endpoints.
+
+Per endpoint één `EndpointSpec`: de tabel, het model, de filters op de API
+en de database, de sleutel, de bewaartermijn, de dagtotalen, de opties van
+de synchronisatie en hoe vaak deze moet draaien. `DB` en `Sync` maken de
+endpoints en taken pas aan als ze worden gebruikt.
+"""
+from typing import NamedTuple, Optional, Type
+
+from aapi_versioned.models import (
+    Model,
+    Afvalbijplaatsing, Afvalcluster, Afvalclusterfractie,
+    Afvalcontainerlocatie, Afvalcontainer, Afvalcontainertype, Afvalweging,
+    AfvalvulgraadSidcon, MeldingMijnAmsterdam, MeldingOpenbareRuimte,
+    Buurt, Stadsdeel, Wijk, Winkelgebied,
+)
+
+
+class Retention(NamedTuple):
+    """Hoe lang vervangen versies van records bewaard blijven.
+
+    Alle versies blijven `keep_days` dagen bewaard. Daarna alleen de
+    versies die aan het begin van een dag actief waren, en na `daily_days`
+    dagen alleen die aan het begin van een maand actief waren. Zonder
+    `daily_days` blijven de dagelijkse versies altijd bewaard.
+    """
+    keep_days: int
+    daily_days: Optional[int] = None
+
+
+class RollupSpec(NamedTuple):
+    """De dagtotalen van een endpoint (zie `Rollup`).
+    """
+    table_name: str
+    key_field: str
+    day_field: str
+    value_field: str
+
+
+class EndpointSpec(NamedTuple):
+    """De beschrijving van een endpoint en de synchronisatie ervan.
+
+    :param name: De naam, gelijk aan die van het endpoint in `aapi.API`.
+    :param table_name: De tabel in de database.
+    :param model: Het DB model.
+    :param api_kwargs: Filters op de API. `{since}` wordt ingevuld met de
+        begindatum van het venster (zie `window_days`).
+    :param db_kwargs: De bijbehorende filters op de database.
+    :param key: De sleutel van een record (zie `Endpoint.key`).
+    :param retention: De bewaartermijn van vervangen versies.
+    :param rollup: De dagtotalen.
+    :param task_kwargs: Opties van de `Task`, bijv. `precheck`.
+    :param window_days: Het aantal dagen terug dat de filters beslaan.
+    :param every_days: Om de hoeveel dagen het endpoint wordt
+        gesynchroniseerd.
+    :param size: Het geschatte aantal records. Kleine endpoints gaan voor.
+    """
+    name: str
+    table_name: str
+    model: Type[Model]
+    api_kwargs: Optional[dict[str, str]] = None
+    db_kwargs: Optional[dict[str, str]] = None
+    key: Optional[tuple[str, ...]] = None
+    retention: Optional[Retention] = None
+    rollup: Optional[RollupSpec] = None
+    task_kwargs: Optional[dict] = None
+    window_days: int = 0
+    every_days: int = 1
+    size: int = 0
+
+
+# Stamgegevens veranderen zelden. Hun records worden eerst vergeleken met
+# de vingerafdruk van de laatste sync. Dit moet meer zijn dan het aantal
+# records van deze endpoints, anders wordt er niks overgeslagen.
+precheck = 10000
+
+# Van endpoints met veel records worden alleen de laatste dertig dagen
+# gesynchroniseerd.
+window = 30
+
+endpoints = [
+    # Huishoudelijk afval
+    # -------------------
+    EndpointSpec(
+        'afval_bijplaatsingen',
+        'v1_huishoudelijkafval_bijplaatsingen',
+        Afvalbijplaatsing,
+        {'datumTijdWaarneming[gte]': '{since}'},
+        {'datumTijdWaarneming__gte': '{since}'},
+        window_days=window,
+        size=20000,
+    ),
+    EndpointSpec(
+        'afval_clusters',
+        'v1_huishoudelijkafval_cluster',
+        Afvalcluster,
+        size=40000,
+    ),
+    EndpointSpec(
+        'afval_clusterfracties',
+        'v1_huishoudelijkafval_clusterfractie',
+        Afvalclusterfractie,
+        size=60000,
+    ),
+    EndpointSpec(
+        'afval_containerlocaties',
+        'v1_huishoudelijkafval_containerlocatie',
+        Afvalcontainerlocatie,
+        size=25000,
+    ),
+    EndpointSpec(
+        'afval_containers',
+        'v1_huishoudelijkafval_container',
+        Afvalcontainer,
+        size=50000,
+    ),
+    EndpointSpec(
+        'afval_containertypes',
+        'v1_huishoudelijkafval_containertype',
+        Afvalcontainertype,
+        task_kwargs={'precheck': precheck},
+        size=500,
+    ),
+    # Het klopt dat de SIDCON vulgraad API "__gt" hanteert.
+    EndpointSpec(
+        'afval_vulgraad_sidcon',
+        'afval_suppliers_sidcon_filllevels',
+        AfvalvulgraadSidcon,
+        {'communication_date_time__gt': '{since}T00:00:00Z',
+         'page_size': 5000},
+        {'communication_date_time__gt': '{since}T00:00:00Z'},
+        window_days=window,
+        key=('container_id',),
+        retention=Retention(30, 365),
+        rollup=RollupSpec('afval_suppliers_sidcon_filllevels_daily',
+                          'container_id', 'communication_date_time',
+                          'filling'),
+        size=2000000,
+    ),
+    EndpointSpec(
+        'afval_wegingen',
+        'v1_huishoudelijkafval_weging',
+        Afvalweging,
+        {'datumWeging[gte]': '{since}'},
+        {'datumWeging__gte': '{since}'},
+        window_days=window,
+        rollup=RollupSpec('v1_huishoudelijkafval_weging_daily',
+                          'clusterId', 'datumWeging', 'nettoGewicht'),
+        size=100000,
+    ),
+
+    # Meldingen
+    # ---------
+    EndpointSpec(
+        'meldingen',
+        'v1_meldingen_meldingen',
+        MeldingOpenbareRuimte,
+        {'datumMelding[gte]': '{since}'},
+        {'datumMelding__gte': '{since}'},
+        window_days=window,
+        task_kwargs={'ignore': ('laatstGezienBron',)},
+        size=500000,
+    ),
+    EndpointSpec(
+        'meldingen_buurt',
+        'v1_meldingen_meldingen_buurt',
+        MeldingMijnAmsterdam,
+        {'datumWijziging[gte]': '{since}'},
+        {'datumWijziging__gte': '{since}'},
+        window_days=window,
+        size=20000,
+    ),
+
+    # Gebieden
+    # --------
+    EndpointSpec(
+        'buurten',
+        'v1_gebieden_buurten',
+        Buurt,
+        task_kwargs={'precheck': precheck},
+        size=1000,
+    ),
+    EndpointSpec(
+        'stadsdelen',
+        'v1_gebieden_stadsdelen',
+        Stadsdeel,
+        task_kwargs={'precheck': precheck},
+        size=10,
+    ),
+    EndpointSpec(
+        'wijken',
+        'v1_gebieden_wijken',
+        Wijk,
+        task_kwargs={'precheck': precheck},
+        size=100,
+    ),
+
+    # Winkelgebieden
+    # --------------
+    EndpointSpec(
+        'winkelgebieden',
+        'v1_winkelgebieden_winkelgebieden',
+        Winkelgebied,
+        task_kwargs={'precheck': precheck},
+        size=100,
+    ),
+]
+
+
+def select(names: Optional[list[str]] = None,
+           specs: Optional[list[EndpointSpec]] = None
+           ) -> list[EndpointSpec]:
+    """Geeft de endpoints met de gegeven namen, van klein naar groot.
+
+    :param names: De namen van de endpoints. Standaard alle endpoints.
+    :param specs: Het register. Standaard `endpoints`.
+    """
+    specs = endpoints if specs is None else specs
+    if names is not None:
+        by_name = {spec.name: spec for spec in specs}
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise KeyError(f'Unknown endpoints: {", ".join(unknown)}.')
+        specs = [by_name[name] for name in names]
+    return sorted(specs, key=lambda spec: spec.size)
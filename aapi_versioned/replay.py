@@ -0,0 +1,108 @@
+"""
+Historische synchronisatie uit gearchiveerde API dumps.
+
+Een dump is een JSON lines bestand (eventueel gzip) met per regel een API
+record als object met de velden van het DB model. De bestandsnaam begint
+met het tijdstip van de dump, bijvoorbeeld `2022-03-17T030000.jsonl.gz`.
+
+Gebruik:
+    python -m aapi_versioned.replay meldingen dumps/meldingen/*.jsonl.gz
+"""
+import argparse
+import gzip
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Type, Union
+
+from aapi import API
+from orjson import orjson
+
+from aapi_versioned.base import connect_db, env_db_config
+from aapi_versioned.db import DB
+from aapi_versioned.models import Model as ModelDB
+from aapi_versioned.sync import Sync, Task, model_transformer
+from aapi_versioned.sync_log import SyncLog
+
+logger = logging.getLogger(__name__)
+
+timestamp_formats = ('%Y-%m-%dT%H%M%S', '%Y%m%dT%H%M%S', '%Y-%m-%d')
+
+
+def dump_timestamp(path: Union[str, Path]) -> datetime:
+    """Leest het tijdstip van de dump uit de bestandsnaam.
+    """
+    stem = Path(path).name.split('.', 1)[0]
+    for fmt in timestamp_formats:
+        try:
+            return datetime.strptime(stem, fmt)
+        except ValueError:
+            pass
+    return datetime.fromisoformat(stem)
+
+
+def read_dump(path: Union[str, Path], model: Type[ModelDB]
+              ) -> Iterator[ModelDB]:
+    """Leest een dump regel voor regel in als DB records. Datums en tijden
+    worden ingelezen door `model_transformer`.
+    """
+    path = Path(path)
+    to_main = model_transformer(model)
+    fields = model._fields
+    open_ = gzip.open if path.suffix == '.gz' else open
+
+    with open_(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = orjson.loads(line)
+            yield to_main(model(*(data.get(k) for k in fields)))
+
+
+def replay(task: Task, paths: Iterable[Union[str, Path]]) -> None:
+    """Synchroniseert een reeks dumps in volgorde van hun tijdstip.
+
+    Elke dump wordt verwerkt alsof deze op het tijdstip van de dump uit
+    de API is gelezen: een job in de sync log en een COPY per dump. Dumps
+    van voor de laatste mutatie in de tabel worden overgeslagen omdat ze
+    de geschiedenis niet meer kunnen aanvullen.
+
+    Het venster van de filters (zie `Task.window_days`) eindigt op het
+    tijdstip van de dump, zodat records uit eerdere dumps binnen dat venster
+    worden vergeleken en niet elke keer opnieuw worden toegevoegd. Records
+    in de dump van buiten het venster worden overgeslagen.
+    """
+    task.main.create_table()
+    last = task.main.last_modified()
+
+    for ts, path in sorted((dump_timestamp(p), Path(p)) for p in paths):
+        if last is not None and ts <= last:
+            logger.warning(f'Skipping {str(path)!r}: {task.task_name!r} '
+                           f'has mutations up to {last}.')
+            continue
+
+        logger.info(f'Replaying {str(path)!r} into {task.task_name!r}.')
+        task_ts = task.at(ts)
+        items = filter(task_ts.main_filter(),
+                       read_dump(path, task.main.model))
+        task_ts.sync(ts, lambda: (task.store(items), False))
+        last = ts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Bouw de geschiedenis op uit gearchiveerde API dumps.')
+    parser.add_argument('task', help='De naam van de taak, bijv. meldingen.')
+    parser.add_argument('paths', nargs='+', help='De dump bestanden.')
+    args = parser.parse_args()
+
+    with connect_db(env_db_config()) as conn:
+        log = SyncLog(conn)
+        log.create_table()
+        sync = Sync(API(), DB(conn), log)
+        replay(getattr(sync, args.task), args.paths)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
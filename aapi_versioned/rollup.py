@@ -0,0 +1,148 @@
+import logging
+from collections.abc import Iterator
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+from psycopg import Connection
+
+from aapi_versioned.base import Query, SimpleDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class DailyAggregate(NamedTuple):
+    key: str
+    day: date
+    count: int
+    min: float
+    max: float
+    mean: float
+    total: float
+
+    @classmethod
+    def fields_sql(cls) -> dict[str, str]:
+        return {
+            'key': 'TEXT NOT NULL',
+            'day': 'DATE NOT NULL',
+            'count': 'INTEGER NOT NULL',
+            'min': 'DOUBLE PRECISION',
+            'max': 'DOUBLE PRECISION',
+            'mean': 'DOUBLE PRECISION',
+            'total': 'DOUBLE PRECISION',
+        }
+
+
+class Rollup(SimpleDatabase):
+    """Dagtotalen per sleutel van een veld in een endpoint.
+
+    De totalen gaan over de actieve records (`_deleted IS NULL`). Na elke
+    job worden alleen de dagen herberekend waarin die job records heeft
+    toegevoegd of verwijderd.
+    """
+    fields = tuple(DailyAggregate._fields)
+
+    def __init__(self, table_name: str, source_table: str, key_field: str,
+                 day_field: str, value_field: str,
+                 connection: Connection) -> None:
+        """Maakt een rollup.
+
+        :param table_name: De tabel met de dagtotalen.
+        :param source_table: De tabel van het endpoint.
+        :param key_field: Het veld waarop wordt gegroepeerd, bijvoorbeeld
+            de container.
+        :param day_field: Het datum- of tijdveld dat de dag bepaalt.
+        :param value_field: Het veld waarover de totalen gaan.
+        :param connection: Verbinding met de database.
+        """
+        super().__init__(connection)
+        self.table_name = table_name
+        self.source_table = source_table
+        self.key_field = key_field
+        self.day_field = day_field
+        self.value_field = value_field
+
+    def all(self, **params) -> Iterator[DailyAggregate]:
+        batch_size = 5000
+        query = (Query.select(self.table_name, self.fields)
+                 .where(**params)
+                 .order_by('key', 'day'))
+        return (DailyAggregate(*row)
+                for row in self.fetchmany(query, batch_size))
+
+    def create_table(self) -> None:
+        """Maakt de tabel met dagtotalen als deze niet al bestaat, en
+        berekent dan meteen alle dagtotalen.
+
+        De index op (sleutel, dag) in de brontabel zorgt dat `update` alleen
+        de records van de geraakte dagen leest.
+        """
+        self.execute(Query.create_index(f'{self.source_table}_rollup_idx',
+                                        self.source_table,
+                                        (self.key_field, self.day_field)))
+
+        query = Query('SELECT to_regclass(%s)', [self.table_name])
+        if self.fetchone(query)[0] is not None:
+            return
+
+        fields_def = DailyAggregate.fields_sql()
+        fields = ', '.join(f'"{f}" {t}' for f, t in fields_def.items())
+        self.execute(Query(f'CREATE TABLE IF NOT EXISTS {self.table_name}'
+                           f' ({fields}, PRIMARY KEY ("key", "day"))'))
+        self.update()
+
+    def update(self, job_id: Optional[datetime] = None) -> None:
+        """Herberekent de dagtotalen van alle dagen waarin de job records
+        heeft toegevoegd of verwijderd.
+
+        :param job_id: Het tijdstip van de job. Zonder job worden alle
+            dagtotalen opnieuw berekend.
+        """
+        self.execute(self.query_update(job_id))
+
+    # Preset queries
+    # --------------
+
+    def query_update(self, job_id: Optional[datetime] = None) -> Query:
+        key = f'"{self.key_field}"'
+        day = f'"{self.day_field}"'
+        value = f'"{self.value_field}"'
+
+        where = ''
+        params = []
+        if job_id is not None:
+            where = ' WHERE "_created" = %s OR "_deleted" = %s'
+            params = [job_id, job_id]
+
+        # Per geraakte (sleutel, dag) worden alleen de records van die dag
+        # gelezen: een bereik op de kolom zelf, zodat de index op
+        # (sleutel, dag) bruikbaar is. Een cast naar ::date is dat niet.
+        # De dagen zonder actieve records vervallen, de rest wordt
+        # (opnieuw) ingevoegd. Alles in 1 statement, dus 1 transactie.
+        return Query(
+            f'WITH changed AS ('
+            f'SELECT DISTINCT {key} AS "k", {day}::date AS "day"'
+            f' FROM {self.source_table}{where}'
+            f'), agg AS ('
+            f'SELECT c."k"::text AS "key", c."day",'
+            f' COUNT(s.{value}) AS "count",'
+            f' MIN(s.{value}) AS "min", MAX(s.{value}) AS "max",'
+            f' AVG(s.{value}) AS "mean", SUM(s.{value}) AS "total"'
+            f' FROM changed c JOIN {self.source_table} s'
+            f' ON s.{key} = c."k"'
+            f' AND s.{day} >= c."day" AND s.{day} < c."day" + 1'
+            f' AND s.{day} >= (SELECT MIN("day") FROM changed)'
+            f' WHERE s."_deleted" IS NULL'
+            f' GROUP BY c."k", c."day"'
+            f'), purged AS ('
+            f'DELETE FROM {self.table_name} r USING changed c'
+            f' WHERE r."key" = c."k"::text AND r."day" = c."day"'
+            f' AND NOT EXISTS (SELECT 1 FROM agg a'
+            f' WHERE a."key" = c."k"::text AND a."day" = c."day")'
+            f') INSERT INTO {self.table_name}'
+            f' ("key", "day", "count", "min", "max", "mean", "total")'
+            f' SELECT * FROM agg'
+            f' ON CONFLICT ("key", "day") DO UPDATE SET'
+            f' "count" = EXCLUDED."count", "min" = EXCLUDED."min",'
+            f' "max" = EXCLUDED."max", "mean" = EXCLUDED."mean",'
+            f' "total" = EXCLUDED."total"',
+            params)
@@ -0,0 +1,316 @@
+"""
+Compacte opslag van records in het geheugen.
+
+Een set van NamedTuples kost per record een tuple plus een Python object per
+veld. `RowStore` bewaart de records per kolom: getallen, datums en tijden
+als typed arrays en strings geïnterneerd, zodat gelijke waardes maar één
+keer in het geheugen staan. Een record wordt pas weer een NamedTuple als het
+wordt opgevraagd, bijvoorbeeld bij het wegschrijven met COPY.
+"""
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Generic, Optional, Type, Union
+
+from aapi_versioned.models import Model, datetimetz
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def _encode_bool(v: bool) -> bool:
+    if type(v) is not bool:
+        raise TypeError('Expected bool.')
+    return v
+
+
+def _encode_date(v: date) -> int:
+    if type(v) is not date:
+        raise TypeError('Expected date.')
+    return v.toordinal()
+
+
+def _encode_datetime(v: datetime) -> int:
+    if type(v) is not datetime or v.tzinfo is not None:
+        raise TypeError('Expected naive datetime.')
+    return (v - EPOCH) // MICROSECOND
+
+
+def _decode_datetime(n: int) -> datetime:
+    return EPOCH + n * MICROSECOND
+
+
+def _encode_datetimetz(v: datetime) -> int:
+    if type(v) is not datetime or v.tzinfo is None:
+        raise TypeError('Expected aware datetime.')
+    return (v - EPOCH_UTC) // MICROSECOND
+
+
+def _decode_datetimetz(n: int) -> datetime:
+    return EPOCH_UTC + n * MICROSECOND
+
+
+def _encode_time(v: time) -> int:
+    if type(v) is not time:
+        raise TypeError('Expected time.')
+    if v.tzinfo is not None:
+        raise TypeError('Time zones are not supported.')
+    return ((v.hour * 60 + v.minute) * 60 + v.second) * 1000000 \
+        + v.microsecond
+
+
+def _decode_time(n: int) -> time:
+    s, us = divmod(n, 1000000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return time(h, m, s, us)
+
+
+def _encode_float(v: float) -> float:
+    if type(v) is not float:
+        raise TypeError('Expected float.')
+    return v
+
+
+def _encode_int(v: int) -> int:
+    if type(v) is not int:
+        raise TypeError('Expected int.')
+    if not -2 ** 63 <= v < 2 ** 63:
+        raise OverflowError('Int too large.')
+    return v
+
+
+# Per type: de typecode van de array, en de functies om een waarde om te
+# zetten naar en terug van de array.
+column_types: dict[Any, tuple[str, Callable[[Any], Any],
+                              Callable[[Any], Any]]] = {
+    bool: ('b', _encode_bool, bool),
+    date: ('q', _encode_date, date.fromordinal),
+    datetime: ('q', _encode_datetime, _decode_datetime),
+    datetimetz: ('q', _encode_datetimetz, _decode_datetimetz),
+    float: ('d', _encode_float, float),
+    int: ('q', _encode_int, int),
+    time: ('q', _encode_time, _decode_time),
+}
+
+
+class Column:
+    """Een kolom van Python objecten. Strings worden geïnterneerd.
+    """
+    __slots__ = ('values',)
+
+    def __init__(self) -> None:
+        self.values: list = []
+
+    def __getitem__(self, i: int) -> Any:
+        return self.values[i]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, value: Any) -> None:
+        self.push(self.prepare(value))
+
+    def prepare(self, value: Any) -> Any:
+        """Zet de waarde om naar wat de kolom opslaat.
+        """
+        if type(value) is str:
+            value = sys.intern(value)
+        return value
+
+    def push(self, value: Any) -> None:
+        """Voegt een waarde van `prepare` toe.
+        """
+        self.values.append(value)
+
+
+class TypedColumn:
+    """Een kolom als typed array, met een bitmap voor None waardes.
+
+    Als een waarde niet in de array past (bijv. een onverwacht type) wordt
+    de kolom omgezet naar een gewone `Column`.
+    """
+    __slots__ = ('values', 'nulls', 'encode', 'decode', 'fallback')
+
+    def __init__(self, typecode: str, encode: Callable[[Any], Any],
+                 decode: Callable[[Any], Any]) -> None:
+        self.values = array(typecode)
+        self.nulls = bytearray()
+        self.encode = encode
+        self.decode = decode
+        self.fallback: Optional[Column] = None
+
+    def __getitem__(self, i: int) -> Any:
+        if self.fallback is not None:
+            return self.fallback[i]
+        if self.nulls[i]:
+            return None
+        return self.decode(self.values[i])
+
+    def __len__(self) -> int:
+        if self.fallback is not None:
+            return len(self.fallback)
+        return len(self.values)
+
+    def append(self, value: Any) -> None:
+        self.push(self.prepare(value))
+
+    def prepare(self, value: Any) -> Any:
+        """Zet de waarde om naar wat de kolom opslaat. Past de waarde niet
+        in de array, dan wordt de kolom eerst een gewone `Column`.
+        """
+        if self.fallback is not None:
+            return self.fallback.prepare(value)
+        if value is None:
+            return None
+        try:
+            return self.encode(value)
+        except (TypeError, ValueError, OverflowError):
+            self._degrade()
+            return self.fallback.prepare(value)
+
+    def push(self, value: Any) -> None:
+        """Voegt een waarde van `prepare` toe.
+        """
+        if self.fallback is not None:
+            self.fallback.push(value)
+        elif value is None:
+            self.values.append(0)
+            self.nulls.append(1)
+        else:
+            self.values.append(value)
+            self.nulls.append(0)
+
+    def _degrade(self) -> None:
+        column = Column()
+        column.values = [self[i] for i in range(len(self))]
+        self.fallback = column
+        self.values = array(self.values.typecode)
+        self.nulls = bytearray()
+
+
+def make_column(typ: Any) -> Union[Column, TypedColumn]:
+    if typ in column_types:
+        return TypedColumn(*column_types[typ])
+    return Column()
+
+
+class RowStore(Generic[Model]):
+    """Een set-achtige verzameling records, per kolom opgeslagen.
+
+    Ondersteunt wat `Task.fetch` en `Task.diff` van een set gebruiken:
+    `add`, `remove`, `in`, `len` en itereren. Voor het opzoeken wordt
+    alleen de hash van elk record bewaard.
+    """
+    __slots__ = ('model', 'columns', 'key', '_index', '_removed', '_len')
+
+    def __init__(self, model: Type[Model],
+                 items: Iterable[Model] = (),
+                 key: Optional[Callable[[tuple], Any]] = None) -> None:
+        """Maakt een lege (of met `items` gevulde) opslag.
+
+        :param model: Het model (NamedTuple) van de records.
+        :param items: De records om toe te voegen.
+        :param key: Bepaalt welk deel van een record gelijk moet zijn
+            voor `in`, `remove` en dubbele records (zie `Normalizer`).
+            Standaard het hele record.
+        """
+        self.model = model
+        self.columns = [make_column(typ)
+                        for typ in model.__annotations__.values()]
+        self.key = key
+        self._index: dict[int, Union[int, list[int]]] = {}
+        self._removed = bytearray()
+        self._len = 0
+
+        for item in items:
+            self.add(item)
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __contains__(self, item: tuple) -> bool:
+        return self._find(item) is not None
+
+    def __iter__(self) -> Iterator[Model]:
+        removed = self._removed
+        for i in range(len(removed)):
+            if not removed[i]:
+                yield self._row(i)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, item: tuple) -> None:
+        """Voegt het record toe, tenzij het er al in zit.
+        """
+        h = hash(item if self.key is None else self.key(item))
+        if self._find(item, h) is not None:
+            return
+
+        # Eerst het hele record omzetten, zodat een fout geen kolommen van
+        # ongelijke lengte achterlaat.
+        values = [column.prepare(value)
+                  for column, value in zip(self.columns, item)]
+        if len(values) != len(self.columns):
+            raise ValueError(f'Expected {len(self.columns)} values.')
+
+        i = len(self._removed)
+        for column, value in zip(self.columns, values):
+            column.push(value)
+        self._removed.append(0)
+        self._len += 1
+
+        found = self._index.get(h)
+        if found is None:
+            self._index[h] = i
+        elif isinstance(found, list):
+            found.append(i)
+        else:
+            self._index[h] = [found, i]
+
+    def clear(self) -> None:
+        self.__init__(self.model, key=self.key)
+
+    def pop(self, item: tuple) -> Model:
+        """Verwijdert het record en geeft het opgeslagen record terug. Met
+        een `key` kan dat verschillen van `item`. Geeft een KeyError als het
+        er niet in zit.
+        """
+        i = self._find(item)
+        if i is None:
+            raise KeyError(item)
+        self._removed[i] = 1
+        self._len -= 1
+        return self._row(i)
+
+    def remove(self, item: tuple) -> None:
+        """Verwijdert het record. Geeft een KeyError als het er niet in zit.
+        """
+        i = self._find(item)
+        if i is None:
+            raise KeyError(item)
+        self._removed[i] = 1
+        self._len -= 1
+
+    def _find(self, item: tuple, h: Optional[int] = None) -> Optional[int]:
+        item_key = item if self.key is None else self.key(item)
+        if h is None:
+            h = hash(item_key)
+
+        found = self._index.get(h)
+        if found is None:
+            return None
+
+        for i in (found if isinstance(found, list) else (found,)):
+            if self._removed[i]:
+                continue
+            row = self._row(i)
+            if (row if self.key is None else self.key(row)) == item_key:
+                return i
+        return None
+
+    def _row(self, i: int) -> Model:
+        return self.model(*(column[i] for column in self.columns))
@@ -0,0 +1,308 @@
+"""
+Lokale HTTP server voor de web UI.
+
+Serveert `web/index.html` en leest de jobs en de mutaties per job live uit
+de database, in plaats van de vooraf geschreven JSON-bestanden van
+`write_stats`. De mutaties van een job zijn per pagina op te vragen:
+
+    GET /data/jobs.json
+    GET /data/{job_id}.json?after=<next>&limit=100
+    GET /data/history/{target}.json?key=<key>
+
+Gebruik:
+    python -m aapi_versioned.server --port 8000
+"""
+import argparse
+import gzip
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from queue import Empty, LifoQueue
+from threading import Lock
+from typing import Any, Iterator, Optional, Union
+from urllib.parse import parse_qs, urlsplit
+
+from orjson import orjson
+from psycopg import Connection
+
+from aapi_versioned.base import connect_db, env_db_config
+from aapi_versioned.db import DB
+from aapi_versioned.sync_log import LogItem, SyncLog
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Een eenvoudige pool van database verbindingen voor de server
+    threads.
+    """
+    def __init__(self, db_config: dict[str, str], size: int = 4) -> None:
+        self.db_config = db_config
+        self.size = size
+        self._idle: LifoQueue[Connection] = LifoQueue()
+        self._count = 0
+        self._lock = Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Leent een verbinding uit de pool.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            conn.close()
+            with self._lock:
+                self._count -= 1
+            raise
+        else:
+            # Sluit een eventueel openstaande (lees)transactie af.
+            conn.rollback()
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+    def _acquire(self) -> Connection:
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        with self._lock:
+            create = self._count < self.size
+            if create:
+                self._count += 1
+        if not create:
+            return self._idle.get()
+        try:
+            return connect_db(self.db_config)
+        except Exception:
+            with self._lock:
+                self._count -= 1
+            raise
+
+
+class ResponseCache:
+    """LRU cache van response bodies.
+    """
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self._items: OrderedDict[Any, bytes] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Any) -> Optional[bytes]:
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key: Any, body: bytes) -> None:
+        with self._lock:
+            self._items[key] = body
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class Server(ThreadingHTTPServer):
+    def __init__(self, address: tuple[str, int], pool: ConnectionPool,
+                 web_root: Union[str, Path] = 'web',
+                 cache: Optional[ResponseCache] = None) -> None:
+        super().__init__(address, RequestHandler)
+        self.pool = pool
+        self.web_root = Path(web_root)
+        self.cache = cache or ResponseCache()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server: Server
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        try:
+            if url.path in ('/', '/index.html'):
+                body = (self.server.web_root / 'index.html').read_bytes()
+                self.respond(body, 'text/html; charset=utf-8')
+            elif url.path == '/data/jobs.json':
+                self.respond(self.jobs())
+            elif (url.path.startswith('/data/history/')
+                    and url.path.endswith('.json')
+                    and 'key' in params):
+                body = self.history(url.path[14:-5], params['key'])
+                if body is None:
+                    self.send_error(HTTPStatus.NOT_FOUND)
+                else:
+                    self.respond(body)
+            elif (url.path.startswith('/data/')
+                    and url.path.endswith('.json')
+                    and url.path[6:-5].isdigit()):
+                body = self.job(int(url.path[6:-5]), params.get('after'),
+                                int(params.get('limit', 100)))
+                if body is None:
+                    self.send_error(HTTPStatus.NOT_FOUND)
+                else:
+                    self.respond(body)
+            else:
+                self.send_error(HTTPStatus.NOT_FOUND)
+        except ValueError as err:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(err))
+        except Exception as err:
+            logger.exception(err)
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def history(self, target: str, key: str) -> Optional[bytes]:
+        """Geeft alle versies van een record (zie `Endpoint.history`).
+
+        :param target: De tabel van het endpoint.
+        :param key: De waardes van `Endpoint.key` als JSON lijst.
+        """
+        with self.server.pool.connection() as conn:
+            endpoint = DB(conn).by_table(target)
+            if endpoint is None or not endpoint.key:
+                return None
+
+            key = tuple(orjson.loads(key))
+            if len(key) != len(endpoint.key):
+                raise ValueError(f'Invalid key for {target!r}.')
+            items = endpoint.history(key if len(key) > 1 else key[0])
+
+        return orjson.dumps({
+            'modified': datetime.now(),
+            'target': target,
+            'key': list(endpoint.key),
+            'fields': list(endpoint.fields),
+            'items': [(v.id, v.created, v.deleted, *v.data) for v in items],
+        })
+
+    def jobs(self) -> bytes:
+        """Geeft de jobs van de afgelopen dertig dagen (zie `write_stats`).
+        """
+        with self.server.pool.connection() as conn:
+            items = list(SyncLog(conn).recent())
+        return orjson.dumps({
+            'modified': datetime.now(),
+            'fields': list(LogItem._fields),
+            'items': [tuple(item) for item in items],
+        })
+
+    def job(self, job_id: int, after: Optional[str], limit: int
+            ) -> Optional[bytes]:
+        """Geeft een pagina van de mutaties van de job.
+
+        Pagina's van afgeronde jobs veranderen niet meer en worden bewaard
+        in de cache.
+        """
+        limit = max(1, min(limit, 1000))
+        key = job_id, after, limit
+        body = self.server.cache.get(key)
+        if body is not None:
+            return body
+
+        with self.server.pool.connection() as conn:
+            log = SyncLog(conn).one(job_id)
+            if log is None:
+                return None
+
+            endpoint = DB(conn).by_table(log.target)
+            if endpoint is None:
+                # Other jobs, like compaction, have no records to show.
+                return orjson.dumps({
+                    'modified': log.started,
+                    'target': log.target,
+                    'key': [],
+                    'fields': ['_id', '_created', '_deleted'],
+                    'items': [],
+                    'next': None,
+                })
+
+            cursor = None if after is None else tuple(orjson.loads(after))
+            items = endpoint.page(log.started, cursor, limit)
+
+        next_ = None
+        if len(items) == limit:
+            ix = [endpoint.fields.index(f) for f in endpoint.sort_fields]
+            next_ = orjson.dumps([items[-1][i] for i in ix]).decode()
+
+        body = orjson.dumps({
+            'modified': log.started,
+            'target': log.target,
+            'key': list(endpoint.key),
+            'fields': list(endpoint.fields),
+            'items': items,
+            'next': next_,
+        })
+
+        if log.status in ('done', 'failed'):
+            self.server.cache.put(key, body)
+        return body
+
+    def respond(self, body: bytes,
+                content_type: str = 'application/json') -> None:
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            encoding = 'gzip'
+        else:
+            encoding = None
+
+        # Een gzip body verschilt van de ongecomprimeerde en krijgt dus
+        # een eigen (strong) ETag.
+        digest = hashlib.sha1(body).hexdigest()
+        etag = f'"{digest}-gzip"' if encoding else f'"{digest}"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        if encoding:
+            body = gzip.compress(body)
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Serveer de web UI met live gegevens uit de database.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--web-root', default='web')
+    parser.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+
+    pool = ConnectionPool(env_db_config(), args.pool_size)
+    server = Server((args.host, args.port), pool, args.web_root)
+    logger.info(f'Serving on http://{args.host}:{args.port}/')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,140 +1,140 @@
+import copy
+import hashlib
 import logging
 import os.path
 import sys
-from datetime import datetime, timedelta
-from operator import itemgetter
-from typing import Any, Callable, Generic, Optional, Type, TypeVar, Union
+from datetime import date, datetime, time, timedelta
+from itertools import chain, islice
+from operator import eq, ge, gt, itemgetter, le, lt, ne
+from typing import (
+    Any, Callable, Generic, Iterable, Optional, Type, TypeVar, Union,
+)
 
 import requests
 from aapi.api import API, Endpoint as EndpointAPI
 from aapi.models import Model as ModelAPI, Point, Polygon, Multipolygon
 
+from aapi_versioned import metrics, registry
 from aapi_versioned.db import DB, Endpoint as EndpointDB
-from aapi_versioned.models import Model as ModelDB
+from aapi_versioned.models import (
+    Model as ModelDB, datetimetz, parse_date, parse_datetime, parse_time,
+)
+from aapi_versioned.registry import EndpointSpec
+from aapi_versioned.rowstore import RowStore
 from aapi_versioned.sync_log import SyncLog
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
-vandaag = datetime.today().date()
-dertig_dagen_terug = vandaag - timedelta(days=30)
-
 
 class Sync:
     """Interface voor alle API -> DB synchronisatie.
+
+    De taken worden beschreven in het register (zie `registry`) en pas
+    aangemaakt als ze worden gebruikt, bijv. `sync.meldingen.pull()`.
     """
-    def __init__(self, api: API, db: DB, log: SyncLog) -> None:
+    def __init__(self, api: API, db: DB, log: SyncLog,
+                 specs: Optional[list[EndpointSpec]] = None) -> None:
         """Maakt een sync interface.
 
         :param api: De Amsterdam API waaruit gegevens worden gelezen.
         :param db: De database waarin alle mutaties worden bijgehouden.
         :param log: Een sync log om statistieken en informatie over de
             synchronisatie bij te houden.
+        :param specs: Het register. Standaard dat van `db`.
+        """
+        self.api = api
+        self.db = db
+        self.log = log
+        self.specs = (db.specs if specs is None
+                      else {spec.name: spec for spec in specs})
+
+    def __getattr__(self, name: str) -> 'Task':
+        # Alleen aangeroepen als de taak nog niet bestaat.
+        if name.startswith('_') or name not in self.__dict__.get('specs', {}):
+            raise AttributeError(name)
+        task = self.task(self.specs[name])
+        setattr(self, name, task)
+        return task
+
+    def task(self, spec: EndpointSpec) -> 'Task':
+        """Maakt de taak van de beschrijving.
         """
-        def task(ep_api: EndpointAPI[ModelAPI],
-                 ep_db: EndpointDB[ModelDB],
-                 kw_api: Optional[dict[str, str]] = None,
-                 kw_db: Optional[dict[str, str]] = None
-                 ) -> Task[ModelAPI, ModelDB]:
-            return Task(ep_api, ep_db, log, kw_api, kw_db)
-
-        toen = dertig_dagen_terug.isoformat()
-
-        # Huishoudelijk afval
-        # -------------------
-        self.afval_bijplaatsingen = task(
-            api.afval_bijplaatsingen,
-            db.afval_bijplaatsingen,
-            {'datumTijdWaarneming[gte]': toen},
-            {'datumTijdWaarneming__gte': toen}
-        )
-        self.afval_clusters = task(
-            api.afval_clusters,
-            db.afval_clusters
-        )
-        self.afval_clusterfracties = task(
-            api.afval_clusterfracties,
-            db.afval_clusterfracties
-        )
-        self.afval_containerlocaties = task(
-            api.afval_containerlocaties,
-            db.afval_containerlocaties
-        )
-        self.afval_containers = task(
-            api.afval_containers,
-            db.afval_containers
-        )
-        self.afval_containertypes = task(
-            api.afval_containertypes,
-            db.afval_containertypes
-        )
-        # Het klopt dat de SIDCON vulgraad API "__gt" hanteert.
-        self.afval_vulgraad_sidcon = task(
-            api.afval_vulgraad_sidcon,
-            db.afval_vulgraad_sidcon,
-            {'communication_date_time__gt': f'{toen}T00:00:00Z',
-             'page_size': 5000},
-            {'communication_date_time__gt': f'{toen}T00:00:00Z'}
-        )
-        self.afval_wegingen = task(
-            api.afval_wegingen,
-            db.afval_wegingen,
-            {'datumWeging[gte]': toen},
-            {'datumWeging__gte': toen}
-        )
-
-        # Meldingen
-        # ---------
-        self.meldingen = task(
-            api.meldingen,
-            db.meldingen,
-            {'datumMelding[gte]': toen},
-            {'datumMelding__gte': toen}
-        )
-        self.meldingen_buurt = task(
-            api.meldingen_buurt,
-            db.meldingen_buurt,
-            {'datumWijziging[gte]': toen},
-            {'datumWijziging__gte': toen}
-        )
-
-        # Gebieden
-        # --------
-        self.buurten = task(
-            api.buurten,
-            db.buurten
-        )
-        self.stadsdelen = task(
-            api.stadsdelen,
-            db.stadsdelen
-        )
-        self.wijken = task(
-            api.wijken,
-            db.wijken
-        )
-
-        # Winkelgebieden
-        # --------------
-        self.winkelgebieden = task(
-            api.winkelgebieden,
-            db.winkelgebieden
-        )
+        return Task(getattr(self.api, spec.name), getattr(self.db, spec.name),
+                    self.log, spec.api_kwargs, spec.db_kwargs,
+                    spec.window_days, **(spec.task_kwargs or {}))
 
     @property
     def tasks(self) -> list['Task']:
         """Geeft de lijst van alle taken.
         """
-        return [task
-                for _, task in vars(self).items()
-                if isinstance(task, Task)]
+        return [getattr(self, name) for name in self.specs]
 
-    def sync_all(self) -> None:
-        """Synchroniseert alle API endpoints waarvoor ook een DB endpoint
-        bestaat.
+    def due(self, spec: EndpointSpec, now: Optional[datetime] = None
+            ) -> bool:
+        """Geeft aan of het endpoint volgens `spec.every_days` weer aan de
+        beurt is.
         """
-        for task in self.tasks:
-            task.pull()
+        last = self.log.last_done(spec.table_name)
+        if last is None:
+            return True
+        # Een uur speling, zodat een dagelijkse job die iets eerder start
+        # niet een dag wordt overgeslagen.
+        interval = timedelta(days=spec.every_days, hours=-1)
+        return (now or datetime.now()) - last >= interval
+
+    def sync_all(self, names: Optional[list[str]] = None,
+                 scheduled: bool = False) -> None:
+        """Synchroniseert alle (of de genoemde) endpoints, van klein naar
+        groot, zodat een groot endpoint de kleine niet ophoudt.
+
+        :param names: De namen van de endpoints. Standaard alle endpoints.
+        :param scheduled: Sla de endpoints over die volgens hun schema nog
+            niet aan de beurt zijn.
+        """
+        for spec in registry.select(names, list(self.specs.values())):
+            if scheduled and not self.due(spec):
+                logger.info(f'Skipping {spec.name!r}: not due yet.')
+                continue
+            getattr(self, spec.name).pull()
+
+
+class Normalizer:
+    """Bepaalt welk deel van een record meetelt in de diff.
+
+    Velden die elke nacht om niks veranderen (zoals een "laatst gezien"
+    tijdstip) of floats die in de laatste decimalen verschillen, zouden
+    anders elke keer een nieuwe versie van het record opleveren.
+    """
+    def __init__(self, model: Type[ModelDB], ignore: Iterable[str] = (),
+                 digits: Optional[dict[str, int]] = None,
+                 strip: bool = False) -> None:
+        fields = model._fields
+        ignore = set(ignore)
+        digits = digits or {}
+
+        for field in ignore | set(digits):
+            if field not in fields:
+                raise ValueError(f'{field!r} is not a field of '
+                                 f'{model.__name__}.')
+
+        self.keep = [i for i, f in enumerate(fields) if f not in ignore]
+        self.digits = {fields.index(f): n for f, n in digits.items()}
+        self.strip = strip
+
+    def __call__(self, item: tuple) -> tuple:
+        values = [item[i] for i in self.keep]
+        if not (self.digits or self.strip):
+            return tuple(values)
+
+        for j, i in enumerate(self.keep):
+            v = values[j]
+            if i in self.digits and isinstance(v, float):
+                values[j] = round(v, self.digits[i])
+            elif self.strip and isinstance(v, str):
+                values[j] = ' '.join(v.split())
+        return tuple(values)
 
 
 class Task(Generic[ModelAPI, ModelDB]):
@@ -149,56 +149,227 @@ class Task(Generic[ModelAPI, ModelDB]):
                  main: EndpointDB[ModelDB],
                  sync_log: SyncLog,
                  origin_kwargs: Optional[dict[str, Any]] = None,
-                 main_kwargs: Optional[dict[str, Any]] = None) -> None:
+                 main_kwargs: Optional[dict[str, Any]] = None,
+                 window_days: int = 0,
+                 precheck: int = 0,
+                 full_sync_days: int = 7,
+                 ignore: Iterable[str] = (),
+                 digits: Optional[dict[str, int]] = None,
+                 strip: bool = False) -> None:
         """
 
         :param origin: Het API endpoint.
         :param main: Het database endpoint.
         :param sync_log: De sync log om informatie over de synchronisatie
             bij te houden.
+        :param origin_kwargs: Filters op de API.
+        :param main_kwargs: De bijbehorende filters op de database.
+        :param window_days: Het aantal dagen terug dat de filters beslaan.
+            In de filters wordt `{since}` ingevuld met de begindatum (zie
+            `Task.at`).
+        :param precheck: Het maximale aantal records waarover een
+            vingerafdruk wordt bepaald om ongewijzigde endpoints over te
+            slaan. Heeft het endpoint meer records, dan wordt er niks
+            overgeslagen. Bij 0 wordt altijd volledig gesynchroniseerd.
+        :param full_sync_days: Na hoeveel dagen er toch volledig wordt
+            gesynchroniseerd, ook als de vingerafdruk niet is veranderd.
+        :param ignore: Velden die wel worden opgeslagen maar niet
+            meetellen in de diff. Een wijziging in alleen deze velden
+            levert geen nieuwe versie op.
+        :param digits: Het aantal decimalen per float veld dat meetelt in
+            de diff.
+        :param strip: Negeer witruimte aan het begin en eind van strings,
+            en meerdere spaties in strings, in de diff.
         """
         self.origin = origin
         self.main = main
         self.log = sync_log
-        self.origin_kwargs = origin_kwargs or {}
-        self.main_kwargs = main_kwargs or {}
+        self.window_days = window_days
+        self._origin_filters = origin_kwargs or {}
+        self._main_filters = main_kwargs or {}
+        self.origin_kwargs, self.main_kwargs = self.window(datetime.now())
+        self.precheck = precheck
+        self.full_sync_days = full_sync_days
+        self.ignore = tuple(ignore)
+        self.digits = digits
+        self.strip = strip
+        self.normalize = (Normalizer(main.model, ignore, digits, strip)
+                          if ignore or digits or strip else None)
 
     @property
     def task_name(self) -> str:
         return self.main.table_name
 
-    def fetch(self) -> tuple[set[ModelDB], bool]:
+    def at(self, ts: datetime) -> 'Task[ModelAPI, ModelDB]':
+        """Geeft een kopie van de taak waarvan het venster eindigt op `ts`,
+        bijvoorbeeld om een dump van dat tijdstip te verwerken.
+        """
+        task = copy.copy(self)
+        task.origin_kwargs, task.main_kwargs = self.window(ts)
+        return task
+
+    def window(self, ts: datetime) -> tuple[dict[str, Any], dict[str, Any]]:
+        """Geeft de filters op de API en de database voor een sync op `ts`.
+        """
+        if not self.window_days:
+            return dict(self._origin_filters), dict(self._main_filters)
+
+        since = (ts - timedelta(days=self.window_days)).date().isoformat()
+
+        def fill(kwargs: dict[str, Any]) -> dict[str, Any]:
+            return {k: v.format(since=since) if isinstance(v, str) else v
+                    for k, v in kwargs.items()}
+
+        return fill(self._origin_filters), fill(self._main_filters)
+
+    def main_filter(self) -> Callable[[ModelDB], bool]:
+        """Geeft een functie die bepaalt of een record binnen de filters op
+        de database (`main_kwargs`) valt, zoals `Query.where` die toepast.
+
+        Voor records die niet via `origin_kwargs` uit de API komen, zoals
+        die uit een dump.
+        """
+        compare = {'lt': lt, 'lte': le, 'le': le, 'eq': eq, 'ne': ne,
+                   'ge': ge, 'gte': ge, 'gt': gt}
+        fields = self.main.model_fields
+        types = self.main.model.__annotations__
+        terms = []
+
+        for k, v in self.main_kwargs.items():
+            field, op = k.rsplit('__', 1) if '__' in k else (k, 'eq')
+            parse = type_methods.get(types[field]) or (lambda x: x)
+            if op == 'isnull':
+                v = bool(v)
+            elif op == 'in':
+                v = {parse(x) for x in v}
+            elif v is not None:
+                v = parse(v)
+            elif op != 'eq':
+                raise ValueError(f'Cannot compare {field!r} with None.')
+            terms.append((fields.index(field), op, v))
+
+        def match(item: ModelDB) -> bool:
+            for i, op, v in terms:
+                value = item[i]
+                if op == 'isnull' or (op == 'eq' and v is None):
+                    if (value is None) != (v is None if op == 'eq' else v):
+                        return False
+                elif op == 'in':
+                    if value not in v:
+                        return False
+                elif value is None or not compare[op](value, v):
+                    return False
+            return True
+
+        return match
+
+    def fetch(self, items: Optional[Iterable[ModelAPI]] = None
+              ) -> tuple[RowStore[ModelDB], bool]:
         """Haalt alle actieve records op uit de API.
+
+        De records worden compact per kolom opgeslagen (zie `RowStore`).
+
+        :param items: De (resterende) records uit de API. Standaard worden
+            alle records opgevraagd.
         """
-        to_main = model_transformer(self.main.model, self.origin.model)
-        origin_main = set()
+        page_size = 1000
+        to_main = page_transformer(self.main.model, self.origin.model)
+        origin_main = self.store()
         partial = False
+        page = []
+
+        if items is None:
+            items = self.origin.all(**self.origin_kwargs)
 
         try:
-            for item in self.origin.all(**self.origin_kwargs):
-                origin_main.add(to_main(item))
+            for item in items:
+                page.append(item)
+                if len(page) >= page_size:
+                    for row in to_main(page):
+                        origin_main.add(row)
+                    page = []
         except requests.HTTPError as err:
             logger.warning(err)
             partial = True
 
+        for row in to_main(page):
+            origin_main.add(row)
+
         return origin_main, partial
 
-    def diff(self, origin_main: set[ModelDB]) -> list[int]:
+    def store(self, items: Iterable[ModelDB] = ()) -> RowStore[ModelDB]:
+        """Geeft een `RowStore` voor de records van deze taak, met de
+        normalisatie van de diff (zie `Normalizer`).
+        """
+        return RowStore(self.main.model, items, key=self.normalize)
+
+    def diff(self, origin_main: RowStore[ModelDB],
+             backfill: tuple[str, ...] = ()) -> list[int]:
         """Markeert alle records die verschillen tussen DB en API.
         Let op: `origin_main` wordt aangepast zodat alleen de nieuwe
         records overblijven (alle + in een diff).
         De functie retourneert een referentie naar alle te verwijderen
         records (alle - in een diff).
+
+        :param backfill: Nieuwe velden die nog leeg zijn in de database
+            (zie `diff_backfill`).
         """
+        if backfill:
+            return self.diff_backfill(origin_main, backfill)
+
         to_main = model_transformer(self.main.model)
+        fields = ('_id',) + self.main.model_fields
         deleted = []
 
-        for rec in self.main.all(_deleted=None, **self.main_kwargs):
-            main_item = to_main(rec.data)
+        for row in self.main.rows(fields, _deleted=None, **self.main_kwargs):
+            main_item = to_main(row[1:])
             try:
                 origin_main.remove(main_item)
             except KeyError:
-                deleted.append(rec.id)
+                deleted.append(row[0])
+
+        return deleted
+
+    def diff_backfill(self, origin_main: RowStore[ModelDB],
+                      new_fields: tuple[str, ...]) -> list[int]:
+        """Als `diff`, voor de eerste sync nadat `migrate` kolommen heeft
+        toegevoegd (zie `EndpointDB.new_fields`).
+
+        De nieuwe velden tellen niet mee in de vergelijking. Records die
+        verder gelijk zijn krijgen de waardes uit de API in hun huidige
+        versie (zie `EndpointDB.backfill`), in plaats van een nieuwe
+        versie. Versies buiten `main_kwargs` blijven leeg.
+        """
+        model = self.main.model
+        new_ix = [self.main.model_fields.index(f) for f in new_fields]
+        normalize = Normalizer(model, self.ignore + new_fields, self.digits,
+                               self.strip)
+
+        matching = RowStore(model, origin_main, key=normalize)
+        origin_main.clear()
+
+        to_main = model_transformer(model)
+        fields = ('_id',) + self.main.model_fields
+        deleted = []
+        backfill = []
+
+        for row in self.main.rows(fields, _deleted=None, **self.main_kwargs):
+            try:
+                item = matching.pop(to_main(row[1:]))
+            except KeyError:
+                deleted.append(row[0])
+                continue
+            values = tuple(item[i] for i in new_ix)
+            if any(v is not None for v in values):
+                backfill.append((row[0],) + values)
+
+        for item in matching:
+            origin_main.add(item)
+
+        if backfill:
+            logger.info(f'Filling {list(new_fields)} of {len(backfill)} '
+                        f'records in {self.task_name!r}.')
+            self.main.backfill(new_fields, backfill)
 
         return deleted
 
@@ -211,35 +382,114 @@ class Task(Generic[ModelAPI, ModelDB]):
         hinderen.
         """
         ts = datetime.now()
+
+        if not self.precheck:
+            self.sync(ts, self.fetch)
+            return
+
+        # Vergelijk alle records met die van de laatste sync. Bij een
+        # ongewijzigde vingerafdruk kan de diff vervallen.
+        try:
+            items = iter(self.origin.all(**self.origin_kwargs))
+            head = list(islice(items, self.precheck + 1))
+            fingerprint = self.fingerprint(head)
+            last_fingerprint, last_ts = self.log.fingerprint(self.task_name)
+        except Exception as err:
+            logger.warning(f'Precheck of {self.task_name!r} failed: {err}')
+            self.sync(ts, self.fetch)
+            return
+
+        if len(head) > self.precheck:
+            # De vingerafdruk dekt niet alle records en zegt dus niks.
+            logger.warning(f'Precheck of {self.task_name!r} covers only '
+                           f'{self.precheck} records. Increase precheck.')
+            self.sync(ts, lambda: self.fetch(chain(head, items)))
+            return
+
+        if (fingerprint == last_fingerprint
+                and ts - last_ts < timedelta(days=self.full_sync_days)):
+            logger.info(f'Skipping {self.task_name!r}: no changes since '
+                        f'{last_ts}.')
+            return
+
+        self.sync(ts, lambda: self.fetch(chain(head, items)), fingerprint)
+
+    def fingerprint(self, items: list[ModelAPI]) -> str:
+        """Geeft een vingerafdruk van de gegeven API records.
+        """
+        to_main = model_transformer(self.main.model, self.origin.model)
+        data = repr((len(items), [to_main(item) for item in items]))
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def sync(self, ts: datetime,
+             fetch: Callable[[], tuple[RowStore[ModelDB], bool]],
+             fingerprint: Optional[str] = None) -> None:
+        """Synchroniseert de records van `fetch` naar main (lokaal) met
+        `ts` als tijdstip van de mutaties.
+
+        :param ts: Het tijdstip van de synchronisatie. Dit wordt de
+            `_created` van nieuwe en `_deleted` van verwijderde records.
+        :param fetch: Een functie die alle actieve records geeft, en of
+            deze mogelijk onvolledig zijn (zie `Task.fetch`).
+        :param fingerprint: De vingerafdruk van de API records die wordt
+            opgeslagen als de sync slaagt (zie `Task.pull`).
+        """
         error = ''
 
         try:
             self.main.create_table()
+            # Nieuwe kolommen blijven in de sync log staan tot een volledige
+            # sync ze heeft ingevuld, ook als deze job mislukt.
+            backfill = tuple(
+                f for f in dict.fromkeys(self.log.backfill(self.task_name)
+                                         + self.main.new_fields)
+                if f in self.main.model_fields)
             job_id = self.log.start(self.task_name, ts)
+            self.main.new_fields = ()
         except Exception as err:
             logger.error(err)
             return
 
-        try:
-            self.log.status(job_id, 'fetch')
-            added, partial = self.fetch()
-
-            # NB. Even when partial is True, added will be updated to
-            #     contain the new records.
-            self.log.status(job_id, 'sync')
-            deleted = self.diff(added)
+        name = self.task_name
 
-            if partial:
-                error = 'HTTP request failed. Cannot sync deletions.'
-                deleted = []
-
-            if added:
-                self.log.status(job_id, 'create', created=len(added))
-                self.main.add(ts, iter(added))
-
-            if deleted:
-                self.log.status(job_id, 'delete', deleted=len(deleted))
-                self.main.delete(ts, deleted)
+        try:
+            with metrics.profile(name):
+                self.log.status(job_id, 'fetch',
+                                backfill=','.join(backfill) or None)
+                with metrics.timer('task_fetch', task=name) as n:
+                    added, partial = fetch()
+                    n[0] = len(added)
+
+                # NB. Even when partial is True, added will be updated to
+                #     contain the new records.
+                self.log.status(job_id, 'sync')
+                with metrics.timer('task_diff', task=name) as n:
+                    deleted = self.diff(added, backfill)
+                    n[0] = len(deleted)
+
+                if partial:
+                    error = 'HTTP request failed. Cannot sync deletions.'
+                    deleted = []
+                elif backfill:
+                    # Alle records zijn vergeleken en ingevuld.
+                    self.log.status(job_id, 'sync', backfill=None)
+
+                if added:
+                    self.log.status(job_id, 'create', created=len(added))
+                    with metrics.timer('task_add', task=name) as n:
+                        self.main.add(ts, iter(added))
+                        n[0] = len(added)
+
+                if deleted:
+                    self.log.status(job_id, 'delete', deleted=len(deleted))
+                    with metrics.timer('task_delete', task=name) as n:
+                        self.main.delete(ts, deleted)
+                        n[0] = len(deleted)
+
+                if self.main.rollup and (added or deleted):
+                    self.log.status(job_id, 'rollup')
+                    with metrics.timer('task_rollup', task=name):
+                        self.main.rollup.update(ts)
 
         except Exception as err:
             exc_type, exc_obj, tb = sys.exc_info()
@@ -253,7 +503,25 @@ class Task(Generic[ModelAPI, ModelDB]):
         if error:
             self.log.status(job_id, 'failed', finished=ts, error=error)
         else:
-            self.log.status(job_id, 'done', finished=ts)
+            self.log.status(job_id, 'done', finished=ts,
+                            fingerprint=fingerprint)
+
+
+def _geometry(x: Union[Point, Polygon, Multipolygon, str]) -> str:
+    return str(x).replace(' ', '')
+
+
+# Omzettingen per veldtype van API waardes naar DB waardes. Datums en tijden
+# die (nog) als tekst binnenkomen worden ingelezen.
+type_methods: dict[Any, Callable[[Any], Any]] = {
+    date: parse_date,
+    datetime: parse_datetime,
+    datetimetz: datetimetz,
+    Multipolygon: _geometry,
+    Point: _geometry,
+    Polygon: _geometry,
+    time: parse_time,
+}
 
 
 def model_transformer(model_to: Type[ModelDB],
@@ -269,12 +537,6 @@ def model_transformer(model_to: Type[ModelDB],
         return model_to(*(None if data_x is None else mapper(data_x)
                           for data_x, mapper in zip(f(data), field_methods)))
 
-    type_methods = {
-        Point: lambda x: str(x).replace(' ', ''),
-        Polygon: lambda x: str(x).replace(' ', ''),
-        Multipolygon: lambda x: str(x).replace(' ', ''),
-    }
-
     field_methods = [
         type_methods.get(typ, _identity)
         for fld, typ in model_to.__annotations__.items()
@@ -285,3 +547,36 @@ def model_transformer(model_to: Type[ModelDB],
                       for field_to in model_to._fields)))
 
     return parse
+
+
+def page_transformer(model_to: Type[ModelDB],
+                     model_from: Optional[Type[ModelAPI]] = None,
+                     ) -> Callable[[list[ModelAPI]], list[ModelDB]]:
+    """Als `model_transformer`, maar zet een hele pagina records in een
+    keer om. Dat gaat per kolom, en velden die niet omgezet hoeven te
+    worden worden overgeslagen.
+    """
+    def parse(page: list[Union[ModelAPI, ModelDB]]) -> list[ModelDB]:
+        if not page:
+            return []
+        columns = [
+            col if mapper is None else
+            [None if x is None else mapper(x) for x in col]
+            for col, mapper in zip(zip(*map(f, page)), field_methods)
+        ]
+        return list(map(model_to._make, zip(*columns)))
+
+    field_methods = [
+        type_methods.get(typ)
+        for fld, typ in model_to.__annotations__.items()
+    ]
+
+    if model_from is None:
+        f = tuple
+    else:
+        ix = [model_from._fields.index(field_to)
+              for field_to in model_to._fields]
+        f = (itemgetter(*ix) if len(ix) > 1 else
+             lambda data: (data[ix[0]],))
+
+    return parse
@@ -1,7 +1,7 @@
 import logging
 from collections.abc import Iterator
 from datetime import datetime, timedelta
-from typing import NamedTuple
+from typing import NamedTuple, Optional
 
 from aapi_versioned.base import Query, SimpleDatabase
 
@@ -46,11 +46,54 @@ class SyncLog(SimpleDatabase):
                  .order_by('target', 'id'))
         return (LogItem(*row) for row in self.fetchmany(query, batch_size))
 
+    def backfill(self, target: str) -> tuple[str, ...]:
+        """Geeft de nieuwe velden die volgens de laatste job van `target`
+        nog moeten worden ingevuld (zie `Task.diff_backfill`).
+        """
+        query = (Query.select(self.table_name, ('backfill',))
+                 .where(target=target)
+                 .order_by('id DESC')
+                 .limit(1))
+        row = self.fetchone(query)
+        return tuple(row[0].split(',')) if row and row[0] else ()
+
     def create_table(self) -> None:
         """Maakt de sync log tabel als deze niet al bestaat.
         """
         query = Query.create_table(self.table_name, LogItem.fields_sql())
         self.execute(query)
+        self.ensure_columns(self.table_name, dict(LogItem.fields_sql(),
+                                                  fingerprint='TEXT',
+                                                  backfill='TEXT'))
+
+    def fingerprint(self, target: str) -> tuple[Optional[str],
+                                                Optional[datetime]]:
+        """Geeft de vingerafdruk en starttijd van de laatste geslaagde job
+        van `target` waarbij een vingerafdruk is opgeslagen.
+        """
+        query = (Query.select(self.table_name, ('fingerprint', 'started'))
+                 .where(target=target, status='done',
+                        fingerprint__isnull=False)
+                 .order_by('id DESC')
+                 .limit(1))
+        return self.fetchone(query) or (None, None)
+
+    def last_done(self, target: str) -> Optional[datetime]:
+        """Geeft de starttijd van de laatste geslaagde job van `target`.
+        """
+        query = (Query.select(self.table_name, ('started',))
+                 .where(target=target, status='done')
+                 .order_by('id DESC')
+                 .limit(1))
+        row = self.fetchone(query)
+        return None if row is None else row[0]
+
+    def one(self, job_id: int) -> Optional[LogItem]:
+        """Geeft de job met het gegeven id, of None als deze niet bestaat.
+        """
+        query = Query.select(self.table_name, self.fields).where(id=job_id)
+        row = self.fetchone(query)
+        return None if row is None else LogItem(*row)
 
     def recent(self) -> Iterator[LogItem]:
         """Geeft alle gelogde jobs van de afgelopen dertig dagen.
@@ -4,7 +4,7 @@ from typing import Union
 
 from orjson import orjson
 
-from aapi_versioned.sync import Sync, Task
+from aapi_versioned.sync import Sync
 from aapi_versioned.sync_log import SyncLog, LogItem
 
 
@@ -29,20 +29,24 @@ def write_stats(path: Union[str, Path], sync: Sync, log: SyncLog) -> None:
         if file_id not in log_ids:
             file.unlink()
 
-    task_for_target: dict[str, Task] = {
-        task.task_name: task
-        for task in sync.tasks
-    }
-
     for log_id, log in log_ids.items():
         if log_id not in file_ids:
-            task = task_for_target[log.target]
-            fields = list(task.main.fields)
-            items = list(task.main.twenty(log.started))
+            # Only the endpoints of the logged targets are created.
+            endpoint = sync.db.by_table(log.target)
+
+            if endpoint is None:
+                # Other jobs, like compaction, have no records to show.
+                key, fields, items = [], ['_id', '_created', '_deleted'], []
+            else:
+                key = list(endpoint.key)
+                fields = list(endpoint.fields)
+                items = list(endpoint.twenty(log.started))
 
             with open(path / f'{log_id}.json', 'wb') as f:
                 f.write(orjson.dumps({
                     'modified': log.started,
+                    'target': log.target,
+                    'key': key,
                     'fields': fields,
                     'items': items,
                 }))
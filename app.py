@@ -1,16 +1,19 @@
+import argparse
 import logging
-from os import getenv
+from typing import Optional
 
 from aapi import API
 
+from aapi_versioned import registry
 from aapi_versioned.db import DB
-from aapi_versioned.base import connect_db
+from aapi_versioned.base import connect_db, env_db_config
 from aapi_versioned.sync import Sync
 from aapi_versioned.sync_log import SyncLog
 from aapi_versioned.web import write_stats
 
 
-def main(db_config: dict[str, str]) -> None:
+def main(db_config: dict[str, str], names: Optional[list[str]] = None,
+         scheduled: bool = False) -> None:
     with connect_db(db_config) as conn:
         api = API()
         db = DB(conn)
@@ -18,10 +21,14 @@ def main(db_config: dict[str, str]) -> None:
 
         log.create_table()
 
+        # Optionally profile every task with cProfile and tracemalloc.
+        # from aapi_versioned import metrics
+        # metrics.instrument(metrics.Metrics(profile_dir='profiles'))
+
         sync = Sync(api, db, log)
 
-        # Sync all:
-        sync.sync_all()
+        # Sync all (or the selected) endpoints, smallest first:
+        sync.sync_all(names, scheduled)
 
         # Or sync individual endpoints:
         # sync.afval_bijplaatsingen.pull()
@@ -33,16 +40,32 @@ def main(db_config: dict[str, str]) -> None:
         # Export summary data for a web UI.
         write_stats('web/data', sync, log)
 
+        # Write timings of all tasks and queries (OpenMetrics format).
+        # from aapi_versioned import metrics
+        # metrics.current().write('web/data/metrics.txt')
+
+        # Export all mutations per job as Parquet files (requires pyarrow).
+        # from aapi_versioned.export import write_changes
+        # write_changes('export', sync, log)
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Synchroniseer de API endpoints naar de database.')
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help='De endpoints, bijv. meldingen. Standaard alle.')
+    parser.add_argument('--scheduled', action='store_true',
+                        help='Sla endpoints over die nog niet aan de beurt '
+                             'zijn.')
+    args = parser.parse_args()
+
+    known = [spec.name for spec in registry.endpoints]
+    unknown = [name for name in args.names if name not in known]
+    if unknown:
+        parser.error(f'unknown endpoints: {", ".join(unknown)}'
+                     f' (choose from {", ".join(known)})')
+
     logging.basicConfig(level=logging.INFO)
     logging.getLogger('urllib3').setLevel(logging.WARNING)
 
-    main({
-        'host': getenv('AAPI_HOST'),
-        'dbname': getenv('AAPI_NAME'),
-        'user': getenv('AAPI_USER'),
-        'password': getenv('AAPI_PASS'),
-        'port': 5432,
-        'sslmode': 'require',
-    })
+    main(env_db_config(), args.names or None, args.scheduled)
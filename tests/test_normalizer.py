@@ -0,0 +1,60 @@
+import unittest
+from typing import NamedTuple
+
+from aapi_versioned.sync import Normalizer
+
+
+class Record(NamedTuple):
+    id: int
+    name: str
+    score: float
+    count: int
+    seen: str
+
+
+def record(**kwargs) -> Record:
+    return Record(1, 'Dam 1', 1.23456, 7, 'vandaag')._replace(**kwargs)
+
+
+class NormalizerTest(unittest.TestCase):
+    def test_default(self):
+        normalize = Normalizer(Record)
+        self.assertEqual(normalize(record()), tuple(record()))
+
+    def test_ignore(self):
+        normalize = Normalizer(Record, ignore=('seen',))
+
+        self.assertEqual(normalize(record()), (1, 'Dam 1', 1.23456, 7))
+        self.assertEqual(normalize(record(seen='gisteren')),
+                         normalize(record()))
+        self.assertNotEqual(normalize(record(name='Dam 2')),
+                            normalize(record()))
+
+    def test_digits(self):
+        normalize = Normalizer(Record, digits={'score': 2, 'count': 0})
+
+        self.assertEqual(normalize(record(score=1.23456)),
+                         normalize(record(score=1.2301)))
+        self.assertNotEqual(normalize(record(score=1.23)),
+                            normalize(record(score=1.24)))
+        # Alleen floats worden afgerond.
+        self.assertEqual(normalize(record(count=7))[3], 7)
+        self.assertIsNone(normalize(record(score=None))[2])
+
+    def test_strip(self):
+        normalize = Normalizer(Record, strip=True)
+
+        self.assertEqual(normalize(record(name='  Dam   1 \n')),
+                         normalize(record()))
+        self.assertIsNone(normalize(record(seen=None))[4])
+        self.assertEqual(normalize(record(score=1.5))[2], 1.5)
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            Normalizer(Record, ignore=('missing',))
+        with self.assertRaises(ValueError):
+            Normalizer(Record, digits={'missing': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
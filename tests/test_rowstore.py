@@ -0,0 +1,113 @@
+import unittest
+from datetime import date, datetime, time, timezone
+from typing import NamedTuple
+
+from aapi_versioned.models import datetimetz
+from aapi_versioned.rowstore import Column, RowStore, TypedColumn
+
+
+class Record(NamedTuple):
+    id: int
+    name: str
+    active: bool
+    score: float
+    day: date
+    moment: datetime
+    moment_tz: datetimetz
+    clock: time
+
+
+def record(i: int, **kwargs) -> Record:
+    return Record(
+        i, f'record {i}', i % 2 == 0, i / 4, date(2022, 3, 17),
+        datetime(2022, 3, 17, 15, 19, 4, 960000),
+        datetime(2022, 3, 17, 15, 19, 4, 960000, tzinfo=timezone.utc),
+        time(9, 52, 36, 123),
+    )._replace(**kwargs)
+
+
+class RowStoreTest(unittest.TestCase):
+    def test_round_trip(self):
+        items = [record(1), record(2), record(3, name=None, clock=None)]
+        store = RowStore(Record, items)
+
+        self.assertEqual(list(store), items)
+        self.assertEqual(len(store), 3)
+        for column in store.columns[2:]:
+            self.assertIsInstance(column, TypedColumn)
+            self.assertIsNone(column.fallback)
+
+    def test_duplicates(self):
+        store = RowStore(Record, [record(1), record(1)])
+        self.assertEqual(len(store), 1)
+
+    def test_degrade_to_objects(self):
+        items = [record(1), record(2, clock='09:52'), record(3)]
+        store = RowStore(Record, items)
+
+        self.assertEqual(list(store), items)
+        self.assertIsInstance(store.columns[7].fallback, Column)
+        self.assertEqual({len(column) for column in store.columns}, {3})
+
+    def test_degrade_on_overflow(self):
+        items = [record(1), record(2 ** 70)]
+        store = RowStore(Record, items)
+        self.assertEqual(list(store), items)
+
+    def test_degrade_on_timezone(self):
+        moment = datetime(2022, 3, 17, tzinfo=timezone.utc)
+        items = [record(1), record(2, moment=moment)]
+        store = RowStore(Record, items)
+        self.assertEqual(list(store), items)
+
+    def test_wrong_length(self):
+        store = RowStore(Record, [record(1)])
+        with self.assertRaises(ValueError):
+            store.add(record(2)[:-1])
+        self.assertEqual({len(column) for column in store.columns}, {1})
+        self.assertEqual(list(store), [record(1)])
+
+    def test_remove_and_contains(self):
+        store = RowStore(Record, [record(1), record(2)])
+
+        self.assertIn(record(1), store)
+        self.assertNotIn(record(3), store)
+        store.remove(record(1))
+        self.assertNotIn(record(1), store)
+        self.assertEqual(list(store), [record(2)])
+        with self.assertRaises(KeyError):
+            store.remove(record(1))
+
+    def test_key(self):
+        def key(item: tuple) -> tuple:
+            return item[:3]
+
+        store = RowStore(Record, [record(1), record(1, score=9.0)], key)
+        self.assertEqual(list(store), [record(1)])
+
+        self.assertIn(record(1, clock=None), store)
+        store.remove(record(1, score=2.0))
+        self.assertFalse(store)
+
+    def test_pop(self):
+        def key(item: tuple) -> tuple:
+            return item[:3]
+
+        store = RowStore(Record, [record(1)], key)
+        self.assertEqual(store.pop(record(1, score=9.0)), record(1))
+        self.assertFalse(store)
+        with self.assertRaises(KeyError):
+            store.pop(record(1))
+
+    def test_clear(self):
+        def key(item: tuple) -> tuple:
+            return item[:1]
+
+        store = RowStore(Record, [record(1)], key)
+        store.clear()
+        self.assertEqual(len(store), 0)
+        self.assertIs(store.key, key)
+
+
+if __name__ == '__main__':
+    unittest.main()